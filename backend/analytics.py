@@ -0,0 +1,271 @@
+"""DAG analytics over the adjacency index.
+
+Everything here works on the CSR arrays of an AdjacencyIndex and runs in
+linear time: Kahn's algorithm for the topological order, Tarjan's
+algorithm (iterative) to pull cycles out of whatever Kahn could not order,
+and a single pass in topological order for longest paths. The analysis is
+recomputed in full whenever the index is rebuilt.
+
+Timing comes from the job data itself. A job's last run is taken to have
+started at the latest cron fire at or before its last_update and finished
+at last_update, which gives its duration. The gap between an upstream
+job's finish and a downstream job's start is the slack a delay has to eat
+through before it propagates.
+"""
+from bisect import bisect_right
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+from croniter import croniter
+
+def parse_timestamp(value):
+    if not value:
+        return None
+    try:
+        parsed = datetime.fromisoformat(value.strip())
+    except (TypeError, ValueError):
+        return None
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone().replace(tzinfo=None)
+    return parsed
+
+
+def estimate_timings(jobs, memo: dict = None) -> dict:
+    """
+    jobs: iterable of (node_id, cron_expression, last_update)
+    Returns {node_id: (start, finish)} as epoch seconds for jobs whose
+    inputs parse. `memo` caches results per (cron, last_update) between
+    calls; it is updated in place and pruned to the jobs seen this time.
+    """
+    memo = {} if memo is None else memo
+    timings = {}
+    pending = defaultdict(list)
+    used = set()
+
+    for node_id, cron_expr, last_update in jobs:
+        if not cron_expr or not last_update:
+            continue
+        key = (cron_expr, last_update)
+        used.add(key)
+        if key in memo:
+            if memo[key] is not None:
+                timings[node_id] = memo[key]
+            continue
+        finished = parse_timestamp(last_update)
+        if finished is None:
+            memo[key] = None
+            continue
+        pending[cron_expr].append((node_id, key, finished))
+
+    for cron_expr, items in pending.items():
+        for (node_id, key, finished), started in zip(items, _previous_fires(cron_expr, [f for _, _, f in items])):
+            timing = None if started is None else (started.timestamp(), finished.timestamp())
+            memo[key] = timing
+            if timing is not None:
+                timings[node_id] = timing
+
+    for key in memo.keys() - used:
+        del memo[key]
+    return timings
+
+
+def _previous_fires(cron_expr: str, times: list) -> list:
+    """Latest fire of cron_expr at or before each of times (None if it can't be computed)"""
+    try:
+        itr = croniter(cron_expr, min(times))
+        first = itr.get_prev(datetime)
+        itr.set_current(first, force=True)
+        period = (itr.get_next(datetime) - first).total_seconds()
+    except Exception:
+        return [None] * len(times)
+
+    # Walking every fire across the span is cheaper than one get_prev per
+    # job when the jobs far outnumber the fires, which is the common case.
+    span = (max(times) - first).total_seconds()
+    if period > 0 and span / period <= len(times):
+        itr.set_current(first, force=True)
+        fires = [first]
+        last = max(times)
+        while fires[-1] <= last:
+            fires.append(itr.get_next(datetime))
+        return [fires[bisect_right(fires, t) - 1] for t in times]
+
+    # get_prev is strictly before its start, so start just after t to include t itself
+    result = []
+    for t in times:
+        itr.set_current(t + timedelta(microseconds=1), force=True)
+        result.append(itr.get_prev(datetime))
+    return result
+
+
+def topological_order(index):
+    """Kahn's algorithm. Returns (order, leftover) where leftover are nodes on or behind a cycle"""
+    n = len(index)
+    in_offsets = index.in_offsets
+    out_offsets = index.out_offsets
+    out_nodes = index.out_nodes
+    remaining = [in_offsets[i + 1] - in_offsets[i] for i in range(n)]
+
+    order = [i for i in range(n) if remaining[i] == 0]
+    head = 0
+    while head < len(order):
+        current = order[head]
+        head += 1
+        for child in out_nodes[out_offsets[current]:out_offsets[current + 1]]:
+            remaining[child] -= 1
+            if remaining[child] == 0:
+                order.append(child)
+
+    leftover = [i for i in range(n) if remaining[i] > 0]
+    return order, leftover
+
+
+def find_cycles(index, candidates) -> list:
+    """Strongly connected components among candidates that form a cycle (iterative Tarjan)"""
+    allowed = set(candidates)
+    out_offsets = index.out_offsets
+    out_nodes = index.out_nodes
+    number = {}
+    low = {}
+    on_stack = set()
+    stack = []
+    cycles = []
+    counter = 0
+
+    for root in candidates:
+        if root in number:
+            continue
+        work = [(root, out_offsets[root])]
+        number[root] = low[root] = counter
+        counter += 1
+        stack.append(root)
+        on_stack.add(root)
+
+        while work:
+            node, k = work[-1]
+            if k < out_offsets[node + 1]:
+                work[-1] = (node, k + 1)
+                child = out_nodes[k]
+                if child not in allowed:
+                    continue
+                if child not in number:
+                    number[child] = low[child] = counter
+                    counter += 1
+                    stack.append(child)
+                    on_stack.add(child)
+                    work.append((child, out_offsets[child]))
+                elif child in on_stack:
+                    low[node] = min(low[node], number[child])
+                continue
+
+            work.pop()
+            if work:
+                parent = work[-1][0]
+                low[parent] = min(low[parent], low[node])
+            if low[node] == number[node]:
+                component = []
+                while True:
+                    member = stack.pop()
+                    on_stack.discard(member)
+                    component.append(member)
+                    if member == node:
+                        break
+                self_loop = node in out_nodes[out_offsets[node]:out_offsets[node + 1]]
+                if len(component) > 1 or self_loop:
+                    cycles.append(component)
+
+    return [sorted(index.ids[i] for i in component) for component in cycles]
+
+
+class GraphAnalytics:
+    def __init__(self, index, timings: dict):
+        """
+        index: AdjacencyIndex
+        timings: {node_id: (start, finish)} from estimate_timings
+        """
+        self.index = index
+        self.timings = [timings.get(node_id) for node_id in index.ids]
+        self.order, leftover = topological_order(index)
+        self.cycles = find_cycles(index, leftover) if leftover else []
+
+        self.rank = [-1] * len(index)
+        for position, i in enumerate(self.order):
+            self.rank[i] = position
+        self._longest_paths()
+
+    def _duration(self, i) -> float:
+        timing = self.timings[i]
+        return max(timing[1] - timing[0], 0.0) if timing else 0.0
+
+    def _longest_paths(self):
+        """Longest duration-weighted path ending at each ordered node"""
+        index = self.index
+        in_offsets = index.in_offsets
+        in_nodes = index.in_nodes
+        finish = [0.0] * len(index)
+        via = [-1] * len(index)
+
+        for i in self.order:
+            best = 0.0
+            best_parent = -1
+            for parent in in_nodes[in_offsets[i]:in_offsets[i + 1]]:
+                if finish[parent] > best:
+                    best = finish[parent]
+                    best_parent = parent
+            finish[i] = best + self._duration(i)
+            via[i] = best_parent
+
+        self.path_length = finish
+        self._via = via
+
+    @property
+    def topological_order(self) -> list:
+        ids = self.index.ids
+        return [ids[i] for i in self.order]
+
+    def critical_path(self) -> dict:
+        if not self.order:
+            return {"nodes": [], "seconds": 0.0}
+        end = max(self.order, key=self.path_length.__getitem__)
+        path = []
+        current = end
+        while current != -1:
+            path.append(self.index.ids[current])
+            current = self._via[current]
+        path.reverse()
+        return {"nodes": path, "seconds": self.path_length[end]}
+
+    def _slack(self, parent, child) -> float:
+        upstream = self.timings[parent]
+        downstream = self.timings[child]
+        if not upstream or not downstream:
+            return 0.0
+        return max(downstream[0] - upstream[1], 0.0)
+
+    def impact(self, node_id, delay: float = None) -> list:
+        """
+        Jobs held up when node_id runs late. Without a delay that is every
+        descendant; with one, only descendants whose slack doesn't absorb it.
+        Returns [(node_id, delay_seconds or None)] in topological order.
+        """
+        index = self.index
+        descendants, _ = index.downstream(node_id)
+        members = [index.index[d] for d in descendants]
+        members.sort(key=lambda i: (self.rank[i] < 0, self.rank[i]))
+
+        if delay is None:
+            return [(index.ids[i], None) for i in members]
+
+        late = {index.index[node_id]: delay}
+        in_offsets = index.in_offsets
+        in_nodes = index.in_nodes
+        result = []
+        for i in members:
+            worst = 0.0
+            for parent in in_nodes[in_offsets[i]:in_offsets[i + 1]]:
+                if parent in late:
+                    worst = max(worst, late[parent] - self._slack(parent, i))
+            if worst > 0:
+                late[i] = worst
+                result.append((index.ids[i], worst))
+        return result
@@ -0,0 +1,125 @@
+"""Synthetic dependency graphs in the CSV format /upload expects.
+
+Jobs are generated in dependency order. Each one picks its upstream jobs
+mostly from the recent past (pipelines are local) and sometimes from a
+small set of hub jobs that many others read from. The number of upstream
+jobs is drawn around --fan-in. last_update is the job's latest cron fire
+plus a short run time, so the schedule and analytics code see plausible
+timings.
+
+    python bench/generate_csv.py --nodes 200000 --fan-in 2 --out lineage.csv
+"""
+from datetime import datetime, timedelta
+import argparse
+import csv
+import random
+import sys
+
+from croniter import croniter
+
+COLUMNS = (
+    "object",
+    "schema",
+    "server",
+    "owner",
+    "creation_date",
+    "last_update",
+    "cron_expression",
+    "depends_on",
+    "position_x",
+    "position_y",
+    "calendar_string",
+)
+
+DEFAULT_CRON_MIX = "*/15 * * * *=0.1,0 * * * *=0.3,30 */4 * * *=0.2,0 3 * * *=0.3,0 6 * * 1=0.1"
+HUB_SHARE = 0.01
+HUB_PROBABILITY = 0.2
+LOCALITY = 200
+
+
+def parse_cron_mix(spec: str) -> list:
+    """'expr=weight,expr=weight' -> [(expr, weight)]"""
+    mix = []
+    for part in spec.split(","):
+        expr, _, weight = part.rpartition("=")
+        mix.append((expr.strip(), float(weight)))
+    return mix
+
+
+def generate_rows(nodes: int, fan_in: float = 2.0, cron_mix=None, positions: bool = False,
+                  weekday_share: float = 0.2, seed: int = 0, now: datetime = None):
+    """Yield CSV row dicts for a synthetic graph of `nodes` jobs"""
+    rng = random.Random(seed)
+    now = now or datetime.now().replace(second=0, microsecond=0)
+    mix = cron_mix or parse_cron_mix(DEFAULT_CRON_MIX)
+    expressions = [expr for expr, _ in mix]
+    weights = [weight for _, weight in mix]
+    last_fires = {expr: croniter(expr, now).get_prev(datetime) for expr in expressions}
+    hubs = max(1, int(nodes * HUB_SHARE))
+    columns = max(1, int(nodes ** 0.5))
+
+    for i in range(nodes):
+        upstream = set()
+        if i:
+            wanted = min(i, max(0, round(rng.gauss(fan_in, fan_in / 2))))
+            while len(upstream) < wanted:
+                if i > hubs and rng.random() < HUB_PROBABILITY:
+                    upstream.add(rng.randrange(hubs))
+                else:
+                    upstream.add(rng.randrange(max(0, i - LOCALITY), i))
+
+        cron_expr = rng.choices(expressions, weights)[0]
+        finished = last_fires[cron_expr] + timedelta(seconds=rng.randint(30, 1800))
+        created = now - timedelta(days=rng.randint(30, 900))
+        yield {
+            "object": f"job_{i:07d}",
+            "schema": f"schema_{rng.randrange(20)}",
+            "server": f"server_{rng.randrange(8)}",
+            "owner": f"owner_{rng.randrange(150)}",
+            "creation_date": created.date().isoformat(),
+            "last_update": min(finished, now).isoformat(),
+            "cron_expression": cron_expr,
+            "depends_on": ";".join(f"job_{j:07d}" for j in sorted(upstream)),
+            "position_x": (i % columns) * 220 + 110 if positions else "",
+            "position_y": (i // columns) * 150 + 75 if positions else "",
+            "calendar_string": "MON-FRI" if rng.random() < weekday_share else "",
+        }
+
+
+def write_csv(out, nodes: int, **options) -> int:
+    writer = csv.DictWriter(out, fieldnames=COLUMNS)
+    writer.writeheader()
+    count = 0
+    for row in generate_rows(nodes, **options):
+        writer.writerow(row)
+        count += 1
+    return count
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--nodes", type=int, default=10000)
+    parser.add_argument("--fan-in", type=float, default=2.0, help="mean number of upstream jobs")
+    parser.add_argument("--cron-mix", default=DEFAULT_CRON_MIX, help="comma-separated expr=weight pairs")
+    parser.add_argument("--weekday-share", type=float, default=0.2, help="share of jobs on a MON-FRI calendar")
+    parser.add_argument("--positions", action="store_true", help="fill position_x/position_y on a grid")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", help="output file (default: stdout)")
+    args = parser.parse_args(argv)
+
+    options = dict(
+        fan_in=args.fan_in,
+        cron_mix=parse_cron_mix(args.cron_mix),
+        positions=args.positions,
+        weekday_share=args.weekday_share,
+        seed=args.seed,
+    )
+    if args.out:
+        with open(args.out, "w", newline="") as out:
+            write_csv(out, args.nodes, **options)
+    else:
+        write_csv(sys.stdout, args.nodes, **options)
+
+
+if __name__ == "__main__":
+    main()
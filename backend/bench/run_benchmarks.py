@@ -0,0 +1,209 @@
+"""Benchmark the backend routes against one or more databases.
+
+    python bench/run_benchmarks.py --nodes 20000 \\
+        --database-url sqlite:////tmp/graph_bench.db \\
+        --database-url postgresql://localhost/graph_bench
+
+For every route this records latency percentiles, SQL queries per call
+(counted by the app's own metrics listener) and the peak Python heap
+growth of one extra call traced with tracemalloc. Each database runs in
+its own subprocess because main.py binds its engine at import time.
+
+WARNING: the target databases are wiped. Requests go through FastAPI's
+TestClient, so httpx must be installed.
+"""
+from datetime import datetime
+import argparse
+import csv
+import io
+import json
+import os
+import random
+import resource
+import subprocess
+import sys
+import time
+import tracemalloc
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+BACKEND_DIR = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, BENCH_DIR)
+
+from generate_csv import COLUMNS, generate_rows  # noqa: E402
+
+DEFAULT_DATABASE = "sqlite:////tmp/graph_bench.db"
+CHANGED_SHARE = 0.01
+
+
+def _percentile(ordered, fraction):
+    return ordered[min(int(fraction * len(ordered)), len(ordered) - 1)]
+
+
+def _csv_bytes(rows) -> bytes:
+    out = io.StringIO()
+    writer = csv.DictWriter(out, fieldnames=COLUMNS)
+    writer.writeheader()
+    writer.writerows(rows)
+    return out.getvalue().encode("utf-8")
+
+
+class Recorder:
+    def __init__(self, metrics):
+        self.metrics = metrics
+        self.results = {}
+
+    def measure(self, name, call, runs, setup=None):
+        """Time `runs` calls, then trace one more for memory. setup() runs untimed before each call."""
+        timings = []
+        queries = []
+        for _ in range(runs):
+            if setup:
+                setup()
+            before = self.metrics.total_queries
+            started = time.perf_counter()
+            response = call()
+            timings.append(time.perf_counter() - started)
+            queries.append(self.metrics.total_queries - before)
+            if response.status_code >= 400:
+                raise RuntimeError(f"{name}: HTTP {response.status_code} {response.text[:200]}")
+
+        if setup:
+            setup()
+        tracemalloc.start()
+        call()
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        ordered = sorted(timings)
+        self.results[name] = {
+            "runs": runs,
+            "p50_ms": round(_percentile(ordered, 0.50) * 1000, 3),
+            "p95_ms": round(_percentile(ordered, 0.95) * 1000, 3),
+            "p99_ms": round(_percentile(ordered, 0.99) * 1000, 3),
+            "max_ms": round(ordered[-1] * 1000, 3),
+            "queries": round(sum(queries) / len(queries), 1),
+            "peak_mb": round(peak / 2 ** 20, 2),
+        }
+        return self.results[name]
+
+
+def run_worker(args) -> dict:
+    """Benchmark the app bound to $DATABASE_URL"""
+    sys.path.insert(0, BACKEND_DIR)
+    from fastapi.testclient import TestClient
+
+    import main
+
+    client = TestClient(main.app)
+    recorder = Recorder(main.metrics)
+    rng = random.Random(args.seed)
+
+    # Grid positions, so the viewport case returns a viewport rather than every node at (0, 0)
+    rows = list(generate_rows(args.nodes, fan_in=args.fan_in, positions=True, seed=args.seed))
+    original = _csv_bytes(rows)
+    for row in rng.sample(rows, max(1, int(len(rows) * CHANGED_SHARE))):
+        row["owner"] = "owner_changed"
+    changed = _csv_bytes(rows)
+    node_ids = [row["object"] for row in rows]
+
+    def upload(data):
+        return client.post("/upload", files={"file": ("bench.csv", data, "text/csv")})
+
+    def reset():
+        return client.delete("/reset")
+
+    def touch():
+        node_id = rng.choice(node_ids)
+        client.post("/positions", json={"id": node_id, "position": {"x": rng.random() * 1000, "y": 0}})
+
+    uploads = iter([changed, original] * args.runs)
+
+    recorder.measure("upload (empty DB)", lambda: upload(original), args.upload_runs, setup=reset)
+    upload(original)
+    recorder.measure("upload (1% changed)", lambda: upload(next(uploads)), args.upload_runs)
+    recorder.measure("get_graph (new version)", lambda: client.get("/graph"), args.runs, setup=touch)
+    recorder.measure("get_graph (cached)", lambda: client.get("/graph"), args.runs)
+    etag = client.get("/graph").headers["etag"]
+    recorder.measure("get_graph (304)", lambda: client.get("/graph", headers={"If-None-Match": etag}), args.runs)
+    recorder.measure(
+        "get_graph (viewport)",
+        lambda: client.get("/graph", params={"min_x": 0, "min_y": 0, "max_x": 2000, "max_y": 1500}),
+        args.runs,
+    )
+    recorder.measure("export (new version)", lambda: client.get("/graph/export"), args.upload_runs, setup=touch)
+    recorder.measure("export (cached)", lambda: client.get("/graph/export"), args.runs)
+    recorder.measure(
+        "save_position",
+        lambda: client.post("/positions", json={"id": rng.choice(node_ids), "position": {"x": 1.0, "y": 2.0}}),
+        args.runs,
+    )
+    recorder.measure(
+        "positions_batch (100)",
+        lambda: client.post("/positions/batch", json={
+            "positions": [{"id": node_id, "x": 1.0, "y": 2.0} for node_id in rng.sample(node_ids, 100)],
+        }),
+        args.runs,
+    )
+    recorder.measure("lineage upstream", lambda: client.get(f"/lineage/{rng.choice(node_ids)}/upstream"), args.runs)
+    recorder.measure("schedule upcoming (6h)", lambda: client.get("/schedule/upcoming", params={"window": "6h"}), args.runs)
+    recorder.measure("reset_graph", reset, args.upload_runs, setup=lambda: upload(original))
+
+    return {
+        "database": main.engine.dialect.name,
+        "nodes": args.nodes,
+        "edges": sum(len(row["depends_on"].split(";")) for row in rows if row["depends_on"]),
+        "max_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        "pool": main.pool_status(main.engine),
+        "routes": recorder.results,
+    }
+
+
+def print_report(report: dict):
+    print(f"\n== {report['database']}: {report['nodes']} nodes, {report['edges']} edges, "
+          f"max RSS {report['max_rss_mb']} MB")
+    print(f"{'route':<28}{'runs':>6}{'p50 ms':>11}{'p95 ms':>11}{'p99 ms':>11}{'queries':>9}{'peak MB':>9}")
+    for name, stats in report["routes"].items():
+        print(f"{name:<28}{stats['runs']:>6}{stats['p50_ms']:>11.2f}{stats['p95_ms']:>11.2f}"
+              f"{stats['p99_ms']:>11.2f}{stats['queries']:>9}{stats['peak_mb']:>9.2f}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", action="append", help=f"repeatable (default: {DEFAULT_DATABASE})")
+    parser.add_argument("--nodes", type=int, default=10000)
+    parser.add_argument("--fan-in", type=float, default=2.0)
+    parser.add_argument("--runs", type=int, default=50, help="calls per cheap route")
+    parser.add_argument("--upload-runs", type=int, default=3, help="calls per upload/export/reset")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json-out", help="also write the reports to this file")
+    parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.worker:
+        print(json.dumps(run_worker(args)))
+        return
+
+    reports = []
+    for url in args.database_url or [DEFAULT_DATABASE]:
+        if url.startswith("sqlite:///") and os.path.exists(url[len("sqlite:///"):]):
+            os.remove(url[len("sqlite:///"):])
+        command = [sys.executable, os.path.abspath(__file__), "--worker"] + [
+            f"--nodes={args.nodes}", f"--fan-in={args.fan_in}", f"--runs={args.runs}",
+            f"--upload-runs={args.upload_runs}", f"--seed={args.seed}",
+        ]
+        done = subprocess.run(command, env={**os.environ, "DATABASE_URL": url}, capture_output=True, text=True)
+        if done.returncode != 0:
+            print(f"\n== {url}: failed\n{done.stderr.strip()}", file=sys.stderr)
+            continue
+        report = json.loads(done.stdout.strip().splitlines()[-1])
+        report["url"] = url
+        reports.append(report)
+        print_report(report)
+
+    if args.json_out:
+        with open(args.json_out, "w") as out:
+            json.dump({"run_at": datetime.now().isoformat(), "reports": reports}, out, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,196 @@
+"""Columnar, dictionary-encoded graph export.
+
+The graph is sent as a sequence of MessagePack frames so it can be
+streamed chunk by chunk:
+
+    {"type": "header", "format": 3, "version": ..., "columns": {...}}
+    {"type": "nodes", "count": n, <string columns>, "labels": [[position, label], ...], "dictionaries": {...}, "codes": {...}, "x": ..., "y": ...}
+    ...
+    {"type": "edges", "count": k, "external": [...], "source": ..., "target": ...}
+    ...
+    {"type": "end", "nodes": N, "edges": E}
+
+A node's label is its id unless "labels" lists it as a [position, label]
+pair, position being the node's index in stream order, so labels cost
+nothing in the usual case. Repetitive string columns are
+dictionary-encoded: each nodes frame carries only the dictionary entries
+that are new since the previous frame, and int32 codes into the
+dictionary so far (-1 for null). Numeric columns are raw little-endian
+arrays (float64 x/y, int32 codes and edge endpoints). Edge endpoints index
+nodes in the order they were streamed; endpoints that are not nodes are
+listed in "external" and numbered after the last node.
+
+The frames only change when the graph is written, so ExportCache keeps
+them for the latest version. Next runs are not included: like /graph,
+clients join /schedule/next on (cron_expression, calendar_string).
+"""
+from array import array
+import sys
+import threading
+
+import msgpack
+
+FORMAT_VERSION = 3
+MEDIA_TYPE = "application/x-msgpack"
+ACCEPTED_MEDIA_TYPES = (MEDIA_TYPE, "application/msgpack")
+STRING_COLUMNS = ("id", "creation_date", "last_update")
+DICTIONARY_COLUMNS = ("schema", "server", "owner", "cron_expression", "calendar_string")
+FLOAT_COLUMNS = ("x", "y")
+
+
+def accepts_export(accept: str) -> bool:
+    """
+    Whether an Accept header allows the export. For each media type we can
+    send, the most specific matching range decides its q; q=0 rules it out.
+    """
+    if not accept or not accept.strip():
+        return True
+    ranges = {}
+    for part in accept.split(","):
+        media_range, *params = [piece.strip() for piece in part.split(";")]
+        if not media_range:
+            continue
+        q = 1.0
+        for param in params:
+            name, _, value = param.partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        media_range = media_range.lower()
+        ranges[media_range] = max(q, ranges.get(media_range, 0.0))
+
+    for media_type in ACCEPTED_MEDIA_TYPES:
+        main_type = media_type.split("/")[0]
+        for candidate in (media_type, f"{main_type}/*", "*/*"):
+            if candidate in ranges:
+                if ranges[candidate] > 0:
+                    return True
+                break
+    return False
+
+
+def _le_bytes(values: array) -> bytes:
+    if sys.byteorder == "big":
+        values.byteswap()
+    return values.tobytes()
+
+
+class DictionaryEncoder:
+    def __init__(self):
+        self.codes = {}
+        self._new = []
+
+    def encode(self, value) -> int:
+        if value is None:
+            return -1
+        code = self.codes.get(value)
+        if code is None:
+            code = self.codes[value] = len(self.codes)
+            self._new.append(value)
+        return code
+
+    def take_new(self) -> list:
+        new = self._new
+        self._new = []
+        return new
+
+
+class GraphEncoder:
+    def __init__(self, version: int, node_columns: tuple):
+        """node_columns: order of the values in the node rows passed to nodes()"""
+        self.version = version
+        self.node_columns = node_columns
+        self.encoders = {column: DictionaryEncoder() for column in DICTIONARY_COLUMNS}
+        self.positions = {}
+        self.external = {}
+        self.edge_count = 0
+        self._packer = msgpack.Packer()
+
+    def header(self) -> bytes:
+        return self._packer.pack({
+            "type": "header",
+            "format": FORMAT_VERSION,
+            "version": self.version,
+            "columns": {
+                "string": list(STRING_COLUMNS),
+                "sparse": ["label"],
+                "dictionary": list(DICTIONARY_COLUMNS),
+                "float64": list(FLOAT_COLUMNS),
+            },
+        })
+
+    def nodes(self, rows: list) -> bytes:
+        """rows: node tuples in node_columns order"""
+        columns = dict(zip(self.node_columns, zip(*rows))) if rows else {c: () for c in self.node_columns}
+        frame = {"type": "nodes", "count": len(rows)}
+        for column in STRING_COLUMNS:
+            frame[column] = list(columns[column])
+        start = len(self.positions)
+        frame["labels"] = [
+            [start + offset, label]
+            for offset, (node_id, label) in enumerate(zip(columns["id"], columns["label"]))
+            if label != node_id
+        ]
+
+        codes = {}
+        for column, encoder in self.encoders.items():
+            encode = encoder.encode
+            values = [encode(value or None) for value in columns[column]]
+            codes[column] = _le_bytes(array("i", values))
+        frame["dictionaries"] = {column: encoder.take_new() for column, encoder in self.encoders.items()}
+        frame["codes"] = codes
+
+        for column in FLOAT_COLUMNS:
+            frame[column] = _le_bytes(array("d", [value or 0.0 for value in columns[column]]))
+
+        for node_id in columns["id"]:
+            self.positions[node_id] = len(self.positions)
+        return self._packer.pack(frame)
+
+    def _endpoint(self, node_id, new_external) -> int:
+        position = self.positions.get(node_id)
+        if position is None:
+            position = self.external.get(node_id)
+            if position is None:
+                position = self.external[node_id] = len(self.positions) + len(self.external)
+                new_external.append(node_id)
+        return position
+
+    def edges(self, edges: list) -> bytes:
+        """edges: list of (source, target) id pairs; send after all nodes"""
+        new_external = []
+        sources = array("i", [self._endpoint(source, new_external) for source, _ in edges])
+        targets = array("i", [self._endpoint(target, new_external) for _, target in edges])
+        self.edge_count += len(edges)
+        return self._packer.pack({
+            "type": "edges",
+            "count": len(edges),
+            "external": new_external,
+            "source": _le_bytes(sources),
+            "target": _le_bytes(targets),
+        })
+
+    def end(self) -> bytes:
+        return self._packer.pack({"type": "end", "nodes": len(self.positions), "edges": self.edge_count})
+
+
+class ExportCache:
+    """Keeps the encoded frames of the latest version only"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entry = None
+
+    def get(self, version: int, build) -> list:
+        """build: callable returning the frames for `version`"""
+        entry = self._entry
+        if entry is not None and entry[0] == version:
+            return entry[1]
+        with self._lock:
+            entry = self._entry
+            if entry is None or entry[0] != version:
+                entry = (version, build())
+                self._entry = entry
+            return entry[1]
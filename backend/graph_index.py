@@ -0,0 +1,121 @@
+"""Compact in-memory adjacency index over the nodes/edges tables.
+
+Node ids are mapped to dense integers and both edge directions are stored
+CSR-style: an offsets array per direction plus flat arrays of neighbour
+indexes and edge indexes. Lineage walks only touch these arrays, so they
+need no DB round trips.
+"""
+from array import array
+
+
+class AdjacencyIndex:
+    def __init__(self, node_ids, edges):
+        """
+        node_ids: iterable of node id strings
+        edges: iterable of (edge_id, source, target) tuples
+        """
+        self.ids = list(node_ids)
+        self.index = {node_id: i for i, node_id in enumerate(self.ids)}
+
+        self.edge_ids = []
+        sources = array("i")
+        targets = array("i")
+        for edge_id, source, target in edges:
+            self.edge_ids.append(edge_id)
+            sources.append(self._intern(source))
+            targets.append(self._intern(target))
+
+        self.edge_sources = sources
+        self.edge_targets = targets
+        self.out_offsets, self.out_nodes, self.out_edges = _build_csr(len(self.ids), sources, targets)
+        self.in_offsets, self.in_nodes, self.in_edges = _build_csr(len(self.ids), targets, sources)
+
+    def _intern(self, node_id):
+        # Edges may point at objects that were never uploaded as rows.
+        i = self.index.get(node_id)
+        if i is None:
+            i = len(self.ids)
+            self.ids.append(node_id)
+            self.index[node_id] = i
+        return i
+
+    def __contains__(self, node_id):
+        return node_id in self.index
+
+    def __len__(self):
+        return len(self.ids)
+
+    @property
+    def edge_count(self):
+        return len(self.edge_ids)
+
+    def upstream(self, node_id, depth=None):
+        """All ancestors of node_id (and the edges leading to them)"""
+        return self._walk(node_id, depth, self.in_offsets, self.in_nodes, self.in_edges)
+
+    def downstream(self, node_id, depth=None):
+        """All descendants of node_id (and the edges leading to them)"""
+        return self._walk(node_id, depth, self.out_offsets, self.out_nodes, self.out_edges)
+
+    def incident_edges(self, node_ids) -> list:
+        """(edge_id, source, target) for every edge touching one of node_ids"""
+        seen = set()
+        for node_id in node_ids:
+            i = self.index.get(node_id)
+            if i is None:
+                continue
+            seen.update(self.out_edges[self.out_offsets[i]:self.out_offsets[i + 1]])
+            seen.update(self.in_edges[self.in_offsets[i]:self.in_offsets[i + 1]])
+
+        ids = self.ids
+        return [
+            (self.edge_ids[k], ids[self.edge_sources[k]], ids[self.edge_targets[k]])
+            for k in sorted(seen)
+        ]
+
+    def _walk(self, node_id, depth, offsets, neighbours, edge_refs):
+        start = self.index[node_id]
+        visited = bytearray(len(self.ids))
+        visited[start] = 1
+        found_nodes = []
+        found_edges = []
+        frontier = [start]
+        level = 0
+
+        while frontier and (depth is None or level < depth):
+            next_frontier = []
+            for current in frontier:
+                lo = offsets[current]
+                hi = offsets[current + 1]
+                found_edges.extend(edge_refs[lo:hi])
+                for neighbour in neighbours[lo:hi]:
+                    if not visited[neighbour]:
+                        visited[neighbour] = 1
+                        found_nodes.append(neighbour)
+                        next_frontier.append(neighbour)
+            frontier = next_frontier
+            level += 1
+
+        ids = self.ids
+        edge_ids = self.edge_ids
+        return [ids[i] for i in found_nodes], [edge_ids[k] for k in found_edges]
+
+
+def _build_csr(node_count, keys, values):
+    """Counting sort of (key, value) pairs into offsets/values/edge-index arrays"""
+    offsets = array("i", bytes(4 * (node_count + 1)))
+    for key in keys:
+        offsets[key + 1] += 1
+    for i in range(node_count):
+        offsets[i + 1] += offsets[i]
+
+    cursor = array("i", offsets)
+    packed_values = array("i", bytes(4 * len(keys)))
+    packed_edges = array("i", bytes(4 * len(keys)))
+    for edge_index, key in enumerate(keys):
+        slot = cursor[key]
+        packed_values[slot] = values[edge_index]
+        packed_edges[slot] = edge_index
+        cursor[key] = slot + 1
+
+    return offsets, packed_values, packed_edges
@@ -0,0 +1,130 @@
+"""Layered (Sugiyama-style) layout over the adjacency index, vectorized with NumPy.
+
+1. Layering: a frontier-at-a-time Kahn pass gives every node its
+   longest-path depth. Nodes on or behind a cycle go on one extra layer.
+2. Crossing reduction: alternating down/up barycenter sweeps. Each layer's
+   barycenters come from one bincount over the edges into that layer.
+3. Coordinates: nodes are pulled towards the mean x of their parents and
+   pushed apart to a minimum spacing with a running maximum.
+"""
+import numpy as np
+
+X_SPACING = 220.0
+Y_SPACING = 150.0
+SWEEPS = 4
+
+
+def _edge_arrays(index):
+    sources = np.frombuffer(index.edge_sources, dtype=np.int32) if index.edge_count else np.zeros(0, np.int32)
+    targets = np.frombuffer(index.edge_targets, dtype=np.int32) if index.edge_count else np.zeros(0, np.int32)
+    return sources.astype(np.int64), targets.astype(np.int64)
+
+
+def assign_layers(n: int, sources, targets) -> np.ndarray:
+    layer = np.full(n, -1, dtype=np.int64)
+    remaining = np.bincount(targets, minlength=n)
+    order = np.argsort(sources, kind="stable")
+    sorted_targets = targets[order]
+    offsets = np.concatenate(([0], np.cumsum(np.bincount(sources, minlength=n))))
+
+    frontier = np.flatnonzero(remaining == 0)
+    depth = 0
+    while frontier.size:
+        layer[frontier] = depth
+        starts = offsets[frontier]
+        counts = offsets[frontier + 1] - starts
+        if not counts.sum():
+            break
+        # Flat positions of every out-edge of the frontier
+        picks = np.repeat(starts - np.concatenate(([0], np.cumsum(counts)[:-1])), counts) + np.arange(counts.sum())
+        children = sorted_targets[picks]
+        np.subtract.at(remaining, children, 1)
+        touched = np.unique(children)
+        frontier = touched[remaining[touched] == 0]
+        depth += 1
+
+    unplaced = layer < 0
+    if unplaced.any():
+        layer[unplaced] = layer.max() + 1
+    return layer
+
+
+def _layer_members(layer):
+    order = np.argsort(layer, kind="stable")
+    bounds = np.flatnonzero(np.diff(layer[order])) + 1
+    return np.split(order, bounds)
+
+
+def _edges_by_layer(layer, from_nodes, to_nodes, keep) -> dict:
+    """{layer: (from, to)} for the kept edges, grouped by the layer of to_nodes"""
+    from_nodes = from_nodes[keep]
+    to_nodes = to_nodes[keep]
+    order = np.argsort(layer[to_nodes], kind="stable")
+    from_nodes = from_nodes[order]
+    to_nodes = to_nodes[order]
+    bounds = np.flatnonzero(np.diff(layer[to_nodes])) + 1
+    return {
+        int(layer[t[0]]): (f, t)
+        for f, t in zip(np.split(from_nodes, bounds), np.split(to_nodes, bounds))
+        if t.size
+    }
+
+
+def _barycenters(values, local, nodes, edges, fallback):
+    """Mean of values[from] per node of the layer, fallback where a node has no such edge"""
+    if edges is None:
+        return fallback
+    from_nodes, to_nodes = edges
+    totals = np.bincount(local[to_nodes], weights=values[from_nodes], minlength=nodes.size)
+    counts = np.bincount(local[to_nodes], minlength=nodes.size)
+    return np.where(counts > 0, totals / np.maximum(counts, 1), fallback)
+
+
+def layered_layout(index, x_spacing: float = X_SPACING, y_spacing: float = Y_SPACING, sweeps: int = SWEEPS):
+    """Returns {node_id: (x, y)} for every node in the index"""
+    n = len(index)
+    if n == 0:
+        return {}
+    sources, targets = _edge_arrays(index)
+    layer = assign_layers(n, sources, targets)
+    members = _layer_members(layer)
+
+    local = np.zeros(n, dtype=np.int64)
+    size = np.zeros(n, dtype=np.int64)
+    for nodes in members:
+        local[nodes] = np.arange(nodes.size)
+        size[nodes] = nodes.size
+    rank = local.copy()
+
+    crossing = layer[sources] != layer[targets]
+    into = _edges_by_layer(layer, sources, targets, crossing)
+    out_of = _edges_by_layer(layer, targets, sources, crossing)
+
+    # Rank scaled to [0, 1] so layers of different widths compare
+    position = rank / np.maximum(size - 1, 1)
+    for sweep in range(sweeps):
+        grouped = into if sweep % 2 == 0 else out_of
+        for nodes in (members if sweep % 2 == 0 else members[::-1]):
+            if nodes.size < 2:
+                continue
+            own = position[nodes]
+            bary = _barycenters(position, local, nodes, grouped.get(int(layer[nodes[0]])), own)
+            reordered = nodes[np.lexsort((own, bary))]
+            rank[reordered] = np.arange(nodes.size)
+            position[reordered] = np.arange(nodes.size) / (nodes.size - 1)
+
+    downward = _edges_by_layer(layer, sources, targets, layer[sources] < layer[targets])
+    x = np.zeros(n)
+    for nodes in members:
+        centred = (rank[nodes] - (nodes.size - 1) / 2) * x_spacing
+        desired = _barycenters(x, local, nodes, downward.get(int(layer[nodes[0]])), centred)
+        # Keep the crossing-reduced order and at least x_spacing between neighbours
+        order = np.argsort(rank[nodes])
+        steps = np.arange(nodes.size) * x_spacing
+        placed = np.maximum.accumulate(desired[order] - steps) + steps
+        x[nodes[order]] = placed - (placed.mean() - desired.mean())
+
+    # Start half a spacing off the origin: (0, 0) marks an unpositioned node
+    x = x - x.min() + x_spacing / 2
+    y = layer * y_spacing + y_spacing / 2
+    return {node_id: (float(x[i]), float(y[i])) for i, node_id in enumerate(index.ids)}
@@ -1,13 +1,28 @@
-from fastapi import FastAPI, File, UploadFile, HTTPException, Depends
+from fastapi import FastAPI, File, UploadFile, HTTPException, Depends, Query, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
 from sqlalchemy import create_engine, Column, String, Float, DateTime, ForeignKey
+from sqlalchemy import select, insert, update, delete, bindparam, case
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker, Session, relationship
-from datetime import datetime
-from croniter import croniter
+from typing import Optional
 import csv
 import io
+import json
+import math
 import os
+import threading
+import time
+
+from analytics import GraphAnalytics, estimate_timings
+from export import MEDIA_TYPE as EXPORT_MEDIA_TYPE, ExportCache, GraphEncoder, accepts_export
+from graph_index import AdjacencyIndex
+from layout import Y_SPACING, layered_layout
+from metrics import Metrics, MetricsMiddleware, pool_status
+from schedule import ScheduleIndex, parse_window
+from positions import PositionBuffer
+from snapshot import ChangeSet, GraphVersion, SnapshotCache, etag_matches
+from spatial import GridIndex, cluster_points
 
 # === DATABASE SETUP ===
 DATABASE_URL = os.getenv("DATABASE_URL")
@@ -70,8 +85,13 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag", "X-Graph-Version"],
 )
 
+metrics = Metrics()
+metrics.track_queries(engine)
+app.add_middleware(MetricsMiddleware, metrics=metrics)
+
 
 def get_db():
     db = SessionLocal()
@@ -81,48 +101,138 @@ def get_db():
         db.close()
 
 
-# === HELPERS ===
-def calculate_next_execution(cron_expr: str) -> str:
-    try:
-        base = datetime.now()
-        itr = croniter(cron_expr, base)
-        return itr.get_next(datetime).isoformat()
-    except Exception:
-        return ""
+# === INGESTION ===
+INGEST_BATCH_SIZE = int(os.getenv("INGEST_BATCH_SIZE", "5000"))
+
+# Columns compared when diffing an upload against the stored graph.
+# x/y belong to the user, so they are left out.
+NODE_DIFF_FIELDS = (
+    "label",
+    "schema",
+    "server",
+    "owner",
+    "creation_date",
+    "last_update",
+    "cron_expression",
+    "calendar_string",
+)
 
 
-# === ROUTES ===
-@app.post("/upload")
-async def upload_csv(file: UploadFile = File(...), db: Session = Depends(get_db)):
-    """Upload and parse new CSV, wipe existing data"""
-    contents = await file.read()
-    decoded = contents.decode("utf-8")
-    reader = csv.DictReader(io.StringIO(decoded))
-
-    db.query(Edge).delete()
-    db.query(Node).delete()
-    db.commit()
+def _parse_node(row: dict) -> dict:
+    node_id = row["object"]
+    return {
+        "id": node_id,
+        "label": row["object"],
+        "schema": row.get("schema", ""),
+        "server": row.get("server", ""),
+        "owner": row.get("owner", ""),
+        "creation_date": row.get("creation_date", ""),
+        "last_update": row.get("last_update", ""),
+        "cron_expression": row.get("cron_expression", ""),
+        "calendar_string": row.get("calendar_string", ""),
+    }
+
+
+def _parse_position(row: dict) -> tuple:
+    x = float(row["position_x"]) if row.get("position_x") else 0
+    y = float(row["position_y"]) if row.get("position_y") else 0
+    return x, y
+
+
+def _chunks(items: list, size: int):
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+def _bulk_insert(db: Session, table, rows: list):
+    """Insert rows with COPY on Postgres, executemany everywhere else"""
+    if not rows:
+        return
+
+    if db.get_bind().dialect.name == "postgresql":
+        raw = db.connection().connection
+        cursor = raw.cursor()
+        if hasattr(cursor, "copy_expert"):
+            columns = list(rows[0].keys())
+            buf = io.StringIO()
+            writer = csv.writer(buf)
+            for row in rows:
+                writer.writerow(["\\N" if row[c] is None else row[c] for c in columns])
+            buf.seek(0)
+            cursor.copy_expert(
+                f"COPY {table.name} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv, NULL '\\N')",
+                buf,
+            )
+            cursor.close()
+            return
+        cursor.close()
+
+    db.execute(insert(table), rows)
+
+
+def _bulk_update_nodes(db: Session, rows: list):
+    if not rows:
+        return
+    table = Node.__table__
+    stmt = (
+        update(table)
+        .where(table.c.id == bindparam("b_id"))
+        .values({field: bindparam(field) for field in NODE_DIFF_FIELDS})
+    )
+    db.execute(stmt, rows)
+
+
+def _bulk_delete(db: Session, table, ids: list):
+    for chunk in _chunks(ids, INGEST_BATCH_SIZE):
+        db.execute(delete(table).where(table.c.id.in_(chunk)))
+
+
+def ingest_csv(db: Session, stream, changes: ChangeSet = None) -> dict:
+    """
+    Stream a CSV upload into the DB, touching only rows that changed.
+
+    Rows are read one at a time from the spooled upload and written in
+    batches of INGEST_BATCH_SIZE. Nodes already in the DB keep their stored
+    x/y; CSV positions only apply to new nodes. Edges are written last so
+    that dependencies declared further down the file already exist.
+    Everything runs in the caller's transaction. If given, `changes` is
+    filled with the ids that were written.
+    """
+    started = time.perf_counter()
+    if changes is None:
+        changes = ChangeSet()
+    nodes_table = Node.__table__
+    edges_table = Edge.__table__
+
+    existing_nodes = {
+        row[0]: tuple(row[1:])
+        for row in db.execute(
+            select(nodes_table.c.id, *(nodes_table.c[f] for f in NODE_DIFF_FIELDS))
+        )
+    }
+    existing_edges = set(db.execute(select(edges_table.c.id)).scalars())
+
+    seen_nodes = {}
+    new_edges = {}
+    to_insert = []
+    to_update = []
+    added = rows_read = 0
 
-    nodes = {}
-    edges = []
+    def flush():
+        _bulk_insert(db, nodes_table, to_insert)
+        _bulk_update_nodes(db, to_update)
+        to_insert.clear()
+        to_update.clear()
+
+    reader = csv.DictReader(stream)
+    if reader.fieldnames is None or "object" not in reader.fieldnames:
+        raise HTTPException(status_code=400, detail="CSV must have an 'object' column")
 
     for row in reader:
-        node_id = row["object"]
-
-        nodes[node_id] = Node(
-            id=node_id,
-            label=row["object"],
-            schema=row.get("schema", ""),
-            server=row.get("server", ""),
-            owner=row.get("owner", ""),
-            creation_date=row.get("creation_date", ""),
-            last_update=row.get("last_update", ""),
-            cron_expression=row.get("cron_expression", ""),
-            next_execution=calculate_next_execution(row.get("cron_expression", "")),
-            x=float(row["position_x"]) if row.get("position_x") else 0,
-            y=float(row["position_y"]) if row.get("position_y") else 0,
-            calendar_string=row.get("calendar_string", "")
-        )
+        rows_read += 1
+        node = _parse_node(row)
+        node_id = node["id"]
+        values = tuple(node[f] for f in NODE_DIFF_FIELDS)
 
         depends_on = row.get("depends_on", "")
         if depends_on:
@@ -130,44 +240,569 @@ async def upload_csv(file: UploadFile = File(...), db: Session = Depends(get_db)
                 dep = dep.strip()
                 if dep:
                     edge_id = f"{dep}->{node_id}"
-                    edges.append(Edge(id=edge_id, source=dep, target=node_id))
+                    new_edges[edge_id] = {"id": edge_id, "source": dep, "target": node_id}
+
+        # A repeated object overrides its earlier row; updates are flushed
+        # after inserts, so this also works before the first row hits the DB.
+        stored = seen_nodes.get(node_id, existing_nodes.get(node_id))
+        if stored is None:
+            x, y = _parse_position(row)
+            to_insert.append({**node, "x": x, "y": y})
+            added += 1
+            changes.nodes.add(node_id)
+        elif stored != values:
+            update_row = {f: node[f] for f in NODE_DIFF_FIELDS}
+            update_row["b_id"] = node_id
+            to_update.append(update_row)
+            changes.nodes.add(node_id)
+        seen_nodes[node_id] = values
+
+        if len(to_insert) + len(to_update) >= INGEST_BATCH_SIZE:
+            flush()
+    flush()
+
+    removed_edges = list(existing_edges - new_edges.keys())
+    added_edges = [new_edges[edge_id] for edge_id in new_edges.keys() - existing_edges]
+    removed_nodes = list(existing_nodes.keys() - seen_nodes.keys())
+    # Existing nodes that got at least one update, however many rows repeated them
+    changed = len(changes.nodes & existing_nodes.keys())
+
+    _bulk_delete(db, edges_table, removed_edges)
+    _bulk_delete(db, nodes_table, removed_nodes)
+    for chunk in _chunks(added_edges, INGEST_BATCH_SIZE):
+        _bulk_insert(db, edges_table, chunk)
+
+    changes.removed_nodes.update(removed_nodes)
+    changes.edges.update(edge["id"] for edge in added_edges)
+    changes.removed_edges.update(removed_edges)
 
-    db.bulk_save_objects(nodes.values())
-    db.bulk_save_objects(edges)
+    elapsed = time.perf_counter() - started
+    return {
+        "rows": rows_read,
+        "seconds": round(elapsed, 3),
+        "rows_per_sec": round(rows_read / elapsed) if elapsed else rows_read,
+        "nodes": {"added": added, "changed": changed, "removed": len(removed_nodes)},
+        "edges": {"added": len(added_edges), "removed": len(removed_edges)},
+    }
+
+
+# === LINEAGE INDEX ===
+_graph_index = None
+_graph_index_lock = threading.Lock()
+
+
+def build_graph_index(db: Session) -> AdjacencyIndex:
+    nodes_table = Node.__table__
+    edges_table = Edge.__table__
+    node_ids = db.execute(select(nodes_table.c.id)).scalars()
+    edges = db.execute(select(edges_table.c.id, edges_table.c.source, edges_table.c.target))
+    return AdjacencyIndex(node_ids, edges)
+
+
+def refresh_graph_index(db: Session) -> AdjacencyIndex:
+    """Rebuild the index from the DB; call after every committed graph write"""
+    global _graph_index
+    with _graph_index_lock:
+        _graph_index = build_graph_index(db)
+        return _graph_index
+
+
+def get_graph_index(db: Session) -> AdjacencyIndex:
+    index = _graph_index
+    if index is None:
+        index = refresh_graph_index(db)
+    return index
+
+
+# === SPATIAL INDEX ===
+OVERVIEW_RESOLUTION = 32
+
+_spatial_index = None
+_spatial_index_lock = threading.Lock()
+
+
+def refresh_spatial_index(db: Session) -> GridIndex:
+    global _spatial_index
+    table = Node.__table__
+    with _spatial_index_lock:
+        _spatial_index = GridIndex(db.execute(select(table.c.id, table.c.x, table.c.y)))
+        return _spatial_index
+
+
+def get_spatial_index(db: Session) -> GridIndex:
+    index = _spatial_index
+    if index is None:
+        index = refresh_spatial_index(db)
+    return index
+
+
+# === SCHEDULE INDEX ===
+UPCOMING_LIMIT = 1000
+
+_schedule_index = None
+_schedule_index_lock = threading.Lock()
+
+
+def refresh_schedule_index(db: Session) -> ScheduleIndex:
+    global _schedule_index
+    table = Node.__table__
+    with _schedule_index_lock:
+        jobs = db.execute(select(table.c.id, table.c.cron_expression, table.c.calendar_string))
+        _schedule_index = ScheduleIndex(jobs)
+        return _schedule_index
+
+
+def get_schedule_index(db: Session) -> ScheduleIndex:
+    index = _schedule_index
+    if index is None:
+        index = refresh_schedule_index(db)
+    return index
+
+
+def refresh_indexes(db: Session):
+    """Rebuild the in-memory indexes after a committed /upload or /reset"""
+    refresh_graph_index(db)
+    refresh_spatial_index(db)
+    refresh_schedule_index(db)
+
+
+# === POSITIONS ===
+POSITION_UPDATE_CHUNK = 500
+# Set POSITION_WRITE_BEHIND=1 to buffer /positions/batch and flush on size or time
+POSITION_WRITE_BEHIND = os.getenv("POSITION_WRITE_BEHIND", "0") == "1"
+POSITION_FLUSH_SIZE = int(os.getenv("POSITION_FLUSH_SIZE", "500"))
+POSITION_FLUSH_SECONDS = float(os.getenv("POSITION_FLUSH_SECONDS", "1.0"))
+
+
+def _finite_position(x, y) -> tuple:
+    """(x, y) as floats; ValueError unless both are finite"""
+    x, y = float(x), float(y)
+    if not (math.isfinite(x) and math.isfinite(y)):
+        raise ValueError("Positions must be finite numbers")
+    return x, y
+
+
+def apply_positions(db: Session, updates: dict) -> int:
+    """Write {node_id: (x, y)} with one UPDATE ... CASE per chunk and commit"""
+    if not updates:
+        return 0
+    table = Node.__table__
+    updated = 0
+    for chunk in _chunks(list(updates.items()), POSITION_UPDATE_CHUNK):
+        stmt = (
+            update(table)
+            .where(table.c.id.in_([node_id for node_id, _ in chunk]))
+            .values(
+                x=case({node_id: x for node_id, (x, _) in chunk}, value=table.c.id),
+                y=case({node_id: y for node_id, (_, y) in chunk}, value=table.c.id),
+            )
+        )
+        updated += db.execute(stmt).rowcount
     db.commit()
 
-    return {"message": "Graph data loaded into DB"}
+    spatial = _spatial_index
+    if spatial is not None:
+        for node_id, (x, y) in updates.items():
+            if node_id in spatial:
+                spatial.move(node_id, x, y)
 
+    if updated:
+        changes = ChangeSet()
+        changes.positions.update(updates)
+        graph_version.bump(changes)
+    return updated
 
-@app.get("/graph")
-def get_graph(db: Session = Depends(get_db)):
-    """Returns graph from DB"""
-    nodes = db.query(Node).all()
-    edges = db.query(Edge).all()
-
-    node_list = [
-        {
-            "id": node.id,
-            "label": node.label,
-            "schema": node.schema,
-            "server": node.server,
-            "owner": node.owner,
-            "creation_date": node.creation_date,
-            "last_update": node.last_update,
-            "cron_expression": node.cron_expression,
-            "next_execution": node.next_execution,
-            "x": node.x,
-            "y": node.y,
-            "calendar_string": node.calendar_string
-        }
-        for node in nodes
+
+def _flush_positions(updates: dict):
+    db = SessionLocal()
+    try:
+        apply_positions(db, updates)
+    finally:
+        db.close()
+
+
+position_buffer = PositionBuffer(_flush_positions, POSITION_FLUSH_SIZE, POSITION_FLUSH_SECONDS)
+
+
+@app.on_event("shutdown")
+def flush_position_buffer():
+    position_buffer.flush()
+
+
+# === ANALYTICS ===
+CYCLE_REPORT_LIMIT = 20
+
+_analytics = None
+_analytics_lock = threading.Lock()
+_timing_memo = {}
+
+
+def refresh_analytics(db: Session) -> GraphAnalytics:
+    """Analyse the current adjacency index from scratch"""
+    global _analytics
+    table = Node.__table__
+    index = get_graph_index(db)
+    with _analytics_lock:
+        jobs = db.execute(select(table.c.id, table.c.cron_expression, table.c.last_update))
+        timings = estimate_timings(jobs, _timing_memo)
+        _analytics = GraphAnalytics(index, timings)
+        return _analytics
+
+
+def get_analytics(db: Session) -> GraphAnalytics:
+    """Cached analysis, redone whenever the adjacency index was rebuilt"""
+    analytics = _analytics
+    if analytics is None or analytics.index is not get_graph_index(db):
+        analytics = refresh_analytics(db)
+    return analytics
+
+
+def cycle_report(analytics: GraphAnalytics) -> dict:
+    return {"count": len(analytics.cycles), "cycles": analytics.cycles[:CYCLE_REPORT_LIMIT]}
+
+
+# === LAYOUT ===
+_layout_cache = None
+_layout_lock = threading.Lock()
+
+
+def _full_layout(db: Session) -> tuple:
+    """
+    Layered layout of the whole graph, cached until nodes or edges change
+    (moving nodes doesn't change it). Returns (positions, cached)
+    """
+    global _layout_cache
+    topology = graph_version.topology
+    with _layout_lock:
+        if _layout_cache is not None and _layout_cache[0] == topology:
+            return _layout_cache[1], True
+        positions = layered_layout(get_graph_index(db))
+        _layout_cache = (topology, positions)
+        return positions, False
+
+
+def _unpositioned_layout(db: Session) -> dict:
+    """Lay out nodes still at (0, 0) among themselves, below the nodes already placed"""
+    current = get_spatial_index(db).snapshot()
+    targets = [node_id for node_id, position in current.items() if position == (0, 0)]
+    if not targets:
+        return {}
+    members = set(targets)
+    edges = [
+        edge for edge in get_graph_index(db).incident_edges(targets)
+        if edge[1] in members and edge[2] in members
     ]
+    positions = layered_layout(AdjacencyIndex(targets, edges))
+
+    placed = [position for position in current.values() if position != (0, 0)]
+    if not placed:
+        return positions
+    dx = min(x for x, _ in placed) - min(x for x, _ in positions.values())
+    dy = max(y for _, y in placed) + Y_SPACING - min(y for _, y in positions.values())
+    return {node_id: (x + dx, y + dy) for node_id, (x, y) in positions.items()}
+
+
+def run_layout(db: Session, only_unpositioned: bool = False) -> dict:
+    """Compute a layered layout and persist the positions that moved in one bulk write"""
+    if only_unpositioned:
+        positions, cached = _unpositioned_layout(db), False
+    else:
+        positions, cached = _full_layout(db)
+
+    current = get_spatial_index(db).snapshot()
+    moved = {
+        node_id: position
+        for node_id, position in positions.items()
+        if node_id in current and current[node_id] != position
+    }
+    updated = apply_positions(db, moved) if moved else 0
+    return {"laid_out": len(positions), "updated": updated, "cached": cached}
+
+
+# === SNAPSHOTS ===
+graph_version = GraphVersion()
+_snapshot_cache = SnapshotCache()
+
+NODE_COLUMNS = (
+    "id",
+    "label",
+    "schema",
+    "server",
+    "owner",
+    "creation_date",
+    "last_update",
+    "cron_expression",
+    "x",
+    "y",
+    "calendar_string",
+)
+
+
+def _select_nodes(ids=None):
+    table = Node.__table__
+    stmt = select(*(table.c[c] for c in NODE_COLUMNS))
+    if ids is not None:
+        stmt = stmt.where(table.c.id.in_(ids))
+    return stmt
 
-    edge_list = [{"source": edge.source, "target": edge.target} for edge in edges]
 
+def _node_dict(row) -> dict:
+    """
+    Row -> /graph node. Next runs move without any write, so they are not
+    part of the node: clients join /schedule/next on (cron_expression,
+    calendar_string) instead of invalidating every snapshot when a job fires.
+    """
+    return dict(zip(NODE_COLUMNS, row))
+
+
+def graph_payload(db: Session) -> dict:
+    edges_table = Edge.__table__
+    node_list = [_node_dict(row) for row in db.execute(_select_nodes())]
+    edge_list = [
+        {"source": source, "target": target}
+        for source, target in db.execute(select(edges_table.c.source, edges_table.c.target))
+    ]
     return {"nodes": node_list, "edges": edge_list}
 
 
+def graph_changes_payload(db: Session, changes: ChangeSet) -> dict:
+    nodes_table = Node.__table__
+    edges_table = Edge.__table__
+    positions_only = list(changes.positions - changes.nodes)
+
+    node_list = []
+    for chunk in _chunks(list(changes.nodes), INGEST_BATCH_SIZE):
+        node_list.extend(_node_dict(row) for row in db.execute(_select_nodes(chunk)))
+
+    positions = []
+    for chunk in _chunks(positions_only, INGEST_BATCH_SIZE):
+        stmt = select(nodes_table.c.id, nodes_table.c.x, nodes_table.c.y).where(nodes_table.c.id.in_(chunk))
+        positions.extend({"id": node_id, "x": x, "y": y} for node_id, x, y in db.execute(stmt))
+
+    edge_list = []
+    for chunk in _chunks(list(changes.edges), INGEST_BATCH_SIZE):
+        stmt = select(edges_table.c.id, edges_table.c.source, edges_table.c.target).where(edges_table.c.id.in_(chunk))
+        edge_list.extend({"id": edge_id, "source": source, "target": target} for edge_id, source, target in db.execute(stmt))
+
+    return {
+        "nodes": node_list,
+        "removed_nodes": sorted(changes.removed_nodes),
+        "edges": edge_list,
+        "removed_edges": sorted(changes.removed_edges),
+        "positions": positions,
+    }
+
+
+def _json_response(payload: dict, headers: dict = None) -> Response:
+    """Serialize large payloads directly instead of through FastAPI's jsonable_encoder"""
+    return Response(content=json.dumps(payload, separators=(",", ":")), media_type="application/json", headers=headers)
+
+
+def viewport_payload(db: Session, bbox: tuple, halo: bool) -> dict:
+    """Nodes inside bbox (plus their direct neighbours with halo) and the edges touching them"""
+    node_ids = get_spatial_index(db).query(*bbox)
+    edges = get_graph_index(db).incident_edges(node_ids)
+
+    if halo:
+        inside = set(node_ids)
+        node_ids.extend({end for _, source, target in edges for end in (source, target)} - inside)
+
+    node_list = []
+    for chunk in _chunks(node_ids, INGEST_BATCH_SIZE):
+        node_list.extend(_node_dict(row) for row in db.execute(_select_nodes(chunk)))
+
+    return {
+        "version": graph_version.version,
+        "nodes": node_list,
+        "edges": [{"source": source, "target": target} for _, source, target in edges],
+    }
+
+
+def overview_payload(db: Session, bbox: Optional[tuple], cell: Optional[float]) -> dict:
+    """Nodes aggregated into square clusters of `cell` canvas units, with edge counts between clusters"""
+    spatial = get_spatial_index(db)
+    # One consistent copy: positions may move while this runs
+    points = spatial.snapshot(spatial.query(*bbox) if bbox is not None else None)
+
+    if cell is None:
+        xs = [x for x, _ in points.values()] or [0.0]
+        ys = [y for _, y in points.values()] or [0.0]
+        extent = max(max(xs) - min(xs), max(ys) - min(ys))
+        cell = extent / OVERVIEW_RESOLUTION or spatial.cell_size
+
+    buckets = cluster_points(points, cell)
+    cluster_of = {}
+    clusters = []
+    for (i, j), members in buckets.items():
+        cluster_id = f"cluster:{i}:{j}"
+        for node_id in members:
+            cluster_of[node_id] = cluster_id
+        clusters.append({
+            "id": cluster_id,
+            "x": sum(points[n][0] for n in members) / len(members),
+            "y": sum(points[n][1] for n in members) / len(members),
+            "count": len(members),
+            "node_id": members[0] if len(members) == 1 else None,
+        })
+
+    edge_counts = {}
+    for _, source, target in get_graph_index(db).incident_edges(points):
+        a = cluster_of.get(source)
+        b = cluster_of.get(target)
+        if a is not None and b is not None and a != b:
+            edge_counts[(a, b)] = edge_counts.get((a, b), 0) + 1
+
+    return {
+        "version": graph_version.version,
+        "cell": cell,
+        "clusters": clusters,
+        "edges": [{"source": a, "target": b, "count": n} for (a, b), n in edge_counts.items()],
+    }
+
+
+# === EXPORT ===
+EXPORT_CHUNK_SIZE = 10000
+
+_export_cache = ExportCache()
+
+
+def build_graph_export(db: Session, version: int) -> list:
+    """MessagePack frames of the columnar graph, read from the DB in chunks"""
+    encoder = GraphEncoder(version, NODE_COLUMNS)
+    frames = [encoder.header()]
+
+    rows = db.execute(_select_nodes().execution_options(yield_per=EXPORT_CHUNK_SIZE))
+    for chunk in rows.partitions():
+        frames.append(encoder.nodes(chunk))
+
+    edges_table = Edge.__table__
+    rows = db.execute(
+        select(edges_table.c.source, edges_table.c.target).execution_options(yield_per=EXPORT_CHUNK_SIZE)
+    )
+    for chunk in rows.partitions():
+        frames.append(encoder.edges(chunk))
+
+    frames.append(encoder.end())
+    return frames
+
+
+# === ROUTES ===
+@app.post("/upload")
+def upload_csv(file: UploadFile = File(...), layout: bool = False, db: Session = Depends(get_db)):
+    """
+    Stream a CSV upload into the DB, applying only the differences.
+    With `layout`, nodes left without a position are laid out afterwards.
+    """
+    stream = io.TextIOWrapper(file.file, encoding="utf-8", newline="")
+    changes = ChangeSet()
+    try:
+        stats = ingest_csv(db, stream, changes)
+        db.commit()
+    except HTTPException:
+        db.rollback()
+        raise
+    except Exception as e:
+        db.rollback()
+        raise HTTPException(status_code=400, detail=str(e))
+    finally:
+        stream.detach()
+
+    # Committed: from here on a failure is a server error, not a bad upload.
+    # The indexes are rebuilt before the bump so that a snapshot built for
+    # the new version never reads the old ones.
+    if changes.empty:
+        # Nothing was written: the indexes, analysis and cached layout still hold
+        stats["cycles"] = cycle_report(get_analytics(db))
+        version = graph_version.version
+    else:
+        refresh_indexes(db)
+        stats["cycles"] = cycle_report(refresh_analytics(db))
+        version = graph_version.bump(changes)
+    if layout:
+        stats["layout"] = run_layout(db, only_unpositioned=True)
+        version = graph_version.version
+    return {"message": "Graph data loaded into DB", "version": version, **stats}
+
+
+@app.get("/graph")
+def get_graph(
+    request: Request,
+    min_x: Optional[float] = None,
+    min_y: Optional[float] = None,
+    max_x: Optional[float] = None,
+    max_y: Optional[float] = None,
+    halo: bool = False,
+    overview: bool = False,
+    cell: Optional[float] = Query(None, gt=0),
+    db: Session = Depends(get_db),
+):
+    """
+    Returns graph from DB, served from a per-version snapshot.
+
+    With a bounding box (min_x, min_y, max_x, max_y) only the nodes inside
+    it and the edges touching them are returned; `halo` adds the nodes one
+    hop outside. `overview` returns clustered nodes instead.
+    """
+    bounds = (min_x, min_y, max_x, max_y)
+    bbox = None
+    if any(v is not None for v in bounds):
+        if any(v is None for v in bounds):
+            raise HTTPException(status_code=400, detail="min_x, min_y, max_x and max_y must be given together")
+        if not all(math.isfinite(v) for v in bounds):
+            raise HTTPException(status_code=400, detail="Bounding box values must be finite")
+        bbox = bounds
+
+    if overview:
+        return _json_response(overview_payload(db, bbox, cell))
+    if bbox is not None:
+        return _json_response(viewport_payload(db, bbox, halo))
+
+    snapshot = _snapshot_cache.get(graph_version.version, lambda: graph_payload(db))
+    headers = {
+        "ETag": snapshot.etag,
+        "X-Graph-Version": str(snapshot.version),
+        "Cache-Control": "no-cache",
+        "Vary": "Accept-Encoding",
+    }
+
+    if etag_matches(request.headers.get("if-none-match", ""), snapshot.etag):
+        return Response(status_code=304, headers=headers)
+
+    if snapshot.compressible and "gzip" in request.headers.get("accept-encoding", ""):
+        headers["Content-Encoding"] = "gzip"
+        return Response(content=snapshot.gzipped, media_type="application/json", headers=headers)
+    return Response(content=snapshot.body, media_type="application/json", headers=headers)
+
+
+@app.get("/graph/export")
+def export_graph(request: Request, db: Session = Depends(get_db)):
+    """
+    Streams the graph as columnar, dictionary-encoded MessagePack frames
+    (see export.py). The frames are encoded once per graph version.
+    """
+    if not accepts_export(request.headers.get("accept", "*/*")):
+        raise HTTPException(status_code=406, detail=f"Export is only available as {EXPORT_MEDIA_TYPE}")
+
+    version = graph_version.version
+    frames = _export_cache.get(version, lambda: build_graph_export(db, version))
+    return StreamingResponse(
+        iter(frames),
+        media_type=EXPORT_MEDIA_TYPE,
+        headers={"X-Graph-Version": str(version)},
+    )
+
+
+@app.get("/graph/changes")
+def get_graph_changes(since: int = Query(...), db: Session = Depends(get_db)):
+    """Nodes, edges and positions changed after version `since`"""
+    version = graph_version.version
+    changes = graph_version.changes_since(since)
+    if changes is None:
+        # Too old (or from another process): the client has to reload /graph
+        return {"version": version, "full_resync": True}
+    return _json_response({"version": version, "full_resync": False, **graph_changes_payload(db, changes)})
+
+
 @app.post("/positions")
 def save_position(data: dict, db: Session = Depends(get_db)):
     """Update position of a single node"""
@@ -176,8 +811,10 @@ def save_position(data: dict, db: Session = Depends(get_db)):
     # y = data.get("y")
     node_id = data.get("id")
     position = data.get("position", {})
-    x = position.get("x", 0)
-    y = position.get("y", 0)
+    try:
+        x, y = _finite_position(position.get("x", 0), position.get("y", 0))
+    except (AttributeError, TypeError, ValueError):
+        raise HTTPException(status_code=400, detail="Position needs finite numeric x and y")
 
 
     node = db.query(Node).filter(Node.id == node_id).first()
@@ -187,8 +824,40 @@ def save_position(data: dict, db: Session = Depends(get_db)):
     node.x = x
     node.y = y
     db.commit()
+    if _spatial_index is not None:
+        _spatial_index.move(node_id, x, y)
+
+    changes = ChangeSet()
+    changes.positions.add(node_id)
+    graph_version.bump(changes)
 
     return {"message": "Position updated"}
+
+
+@app.post("/positions/batch")
+def save_positions(data: dict, db: Session = Depends(get_db)):
+    """Update many node positions: {"positions": [{"id", "x", "y"}, ...]}"""
+    updates = {}
+    try:
+        for item in data.get("positions", []):
+            updates[item["id"]] = _finite_position(item["x"], item["y"])
+    except (KeyError, TypeError, ValueError):
+        raise HTTPException(status_code=400, detail="Each position needs an id and finite numeric x and y")
+
+    if POSITION_WRITE_BEHIND:
+        position_buffer.add(updates)
+        return {"message": "Positions queued", "queued": len(updates)}
+
+    updated = apply_positions(db, updates)
+    return {"message": "Positions updated", "updated": updated}
+
+
+@app.get("/positions/stats")
+def position_stats():
+    """Write-behind buffer counters"""
+    return {"write_behind": POSITION_WRITE_BEHIND, **position_buffer.stats()}
+
+
 # DELETE: Reset all nodes and edges
 @app.delete("/reset")
 def reset_graph(db: Session = Depends(get_db)):
@@ -196,7 +865,124 @@ def reset_graph(db: Session = Depends(get_db)):
         db.query(Edge).delete()
         db.query(Node).delete()
         db.commit()
+        refresh_indexes(db)
+        graph_version.bump()
         return {"status": "reset complete"}
     except Exception as e:
         db.rollback()
         raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.get("/lineage/{node_id}/upstream")
+def get_upstream(node_id: str, depth: Optional[int] = Query(None, ge=1), db: Session = Depends(get_db)):
+    """Ancestors of a node, optionally limited to `depth` hops"""
+    index = get_graph_index(db)
+    if node_id not in index:
+        raise HTTPException(status_code=404, detail="Node not found")
+    nodes, edges = index.upstream(node_id, depth)
+    return {"id": node_id, "nodes": nodes, "edges": edges}
+
+
+@app.get("/lineage/{node_id}/downstream")
+def get_downstream(node_id: str, depth: Optional[int] = Query(None, ge=1), db: Session = Depends(get_db)):
+    """Descendants of a node, optionally limited to `depth` hops"""
+    index = get_graph_index(db)
+    if node_id not in index:
+        raise HTTPException(status_code=404, detail="Node not found")
+    nodes, edges = index.downstream(node_id, depth)
+    return {"id": node_id, "nodes": nodes, "edges": edges}
+
+
+@app.get("/schedule/upcoming")
+def get_upcoming(
+    window: str = "6h",
+    limit: int = Query(UPCOMING_LIMIT, ge=1),
+    db: Session = Depends(get_db),
+):
+    """Runs due within `window` (e.g. 30m, 6h, 2d), earliest first"""
+    try:
+        seconds = parse_window(window)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    runs = get_schedule_index(db).upcoming(seconds, limit=limit + 1)
+    return {
+        "window_seconds": seconds,
+        "truncated": len(runs) > limit,
+        "runs": [{"id": node_id, "run_at": run.isoformat()} for run, node_id in runs[:limit]],
+    }
+
+
+@app.get("/schedule/next")
+def get_next_runs(request: Request, db: Session = Depends(get_db)):
+    """
+    Next run of every (cron_expression, calendar_string) group. Nodes carry
+    those two fields; join on them to get a node's next execution. The ETag
+    changes when the graph is written or the earliest of these runs passes.
+    """
+    next_runs = get_schedule_index(db).next_runs()
+    earliest = min(next_runs.values(), default=None)
+    etag = f'"{graph_version.version}-{int(earliest.timestamp()) if earliest else 0}"'
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if etag_matches(request.headers.get("if-none-match", ""), etag):
+        return Response(status_code=304, headers=headers)
+
+    runs = [
+        {"cron_expression": cron_expr, "calendar_string": calendar, "next_execution": run.isoformat()}
+        for (cron_expr, calendar), run in sorted(next_runs.items(), key=lambda item: item[1])
+    ]
+    return _json_response({"runs": runs}, headers)
+
+
+@app.get("/analytics/order")
+def get_topological_order(db: Session = Depends(get_db)):
+    """Nodes in dependency order; nodes on or behind a cycle are left out"""
+    analytics = get_analytics(db)
+    return {"order": analytics.topological_order, "cycles": cycle_report(analytics)}
+
+
+@app.get("/analytics/cycles")
+def get_cycles(db: Session = Depends(get_db)):
+    """Groups of nodes that depend on each other in a loop"""
+    analytics = get_analytics(db)
+    return {"count": len(analytics.cycles), "cycles": analytics.cycles}
+
+
+@app.get("/analytics/critical-path")
+def get_critical_path(db: Session = Depends(get_db)):
+    """Longest chain of dependencies, weighted by each job's last run duration"""
+    return get_analytics(db).critical_path()
+
+
+@app.get("/analytics/impact/{node_id}")
+def get_impact(node_id: str, delay: Optional[float] = Query(None, gt=0), db: Session = Depends(get_db)):
+    """Jobs held up when a node runs late, optionally by `delay` seconds"""
+    analytics = get_analytics(db)
+    if node_id not in analytics.index:
+        raise HTTPException(status_code=404, detail="Node not found")
+    impacted = analytics.impact(node_id, delay)
+    return {
+        "id": node_id,
+        "delay": delay,
+        "count": len(impacted),
+        "nodes": [{"id": impacted_id, "delay": seconds} for impacted_id, seconds in impacted],
+    }
+
+
+@app.post("/layout")
+def layout_graph(only_unpositioned: bool = False, db: Session = Depends(get_db)):
+    """Lay the graph out in layers and save the positions; only nodes at (0, 0) with `only_unpositioned`"""
+    result = run_layout(db, only_unpositioned)
+    return {"message": "Layout applied", "version": graph_version.version, **result}
+
+
+@app.get("/metrics")
+def get_metrics():
+    """Per-route timings and query counts, DB pool usage and write-behind counters"""
+    return {
+        "graph_version": graph_version.version,
+        "queries": metrics.total_queries,
+        "pool": pool_status(engine),
+        "positions": position_buffer.stats(),
+        "routes": metrics.summary(),
+    }
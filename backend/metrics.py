@@ -0,0 +1,149 @@
+"""Per-route request metrics and SQL query counting.
+
+Each request gets a RequestStats object in a context variable; a
+SQLAlchemy cursor listener bumps its query count. Sync endpoints run in a
+worker thread with a copy of the context, so the object (not the variable)
+carries the count back. A request is recorded once the last chunk of its
+body has been sent, so streamed responses are timed in full. Route timings
+keep a bounded window of recent durations for the percentiles.
+"""
+from collections import deque
+from contextvars import ContextVar
+import threading
+import time
+
+from sqlalchemy import event
+
+WINDOW_SIZE = 1024
+
+
+class RequestStats:
+    __slots__ = ("queries",)
+
+    def __init__(self):
+        self.queries = 0
+
+
+_current = ContextVar("request_stats", default=None)
+
+
+def _percentile(ordered: list, fraction: float) -> float:
+    if not ordered:
+        return 0.0
+    return ordered[min(int(fraction * len(ordered)), len(ordered) - 1)]
+
+
+class RouteStats:
+    def __init__(self, window: int):
+        self.count = 0
+        self.errors = 0
+        self.total_seconds = 0.0
+        self.max_seconds = 0.0
+        self.queries = 0
+        self.recent = deque(maxlen=window)
+
+    def summary(self) -> dict:
+        ordered = sorted(self.recent)
+        return {
+            "count": self.count,
+            "errors": self.errors,
+            "mean_ms": round(self.total_seconds / self.count * 1000, 3) if self.count else 0.0,
+            "p50_ms": round(_percentile(ordered, 0.50) * 1000, 3),
+            "p95_ms": round(_percentile(ordered, 0.95) * 1000, 3),
+            "p99_ms": round(_percentile(ordered, 0.99) * 1000, 3),
+            "max_ms": round(self.max_seconds * 1000, 3),
+            "queries": self.queries,
+            "queries_per_request": round(self.queries / self.count, 2) if self.count else 0.0,
+        }
+
+
+class Metrics:
+    def __init__(self, window: int = WINDOW_SIZE):
+        self.window = window
+        self.routes = {}
+        self.total_queries = 0
+        self._lock = threading.Lock()
+
+    def track_queries(self, engine):
+        event.listen(engine, "before_cursor_execute", self._on_query)
+
+    def _on_query(self, *args):
+        stats = _current.get()
+        if stats is not None:
+            stats.queries += 1
+        with self._lock:
+            self.total_queries += 1
+
+    def begin(self) -> RequestStats:
+        stats = RequestStats()
+        _current.set(stats)
+        return stats
+
+    def record(self, route: str, seconds: float, stats: RequestStats, error: bool = False):
+        with self._lock:
+            route_stats = self.routes.get(route)
+            if route_stats is None:
+                route_stats = self.routes[route] = RouteStats(self.window)
+            route_stats.count += 1
+            route_stats.errors += error
+            route_stats.total_seconds += seconds
+            route_stats.max_seconds = max(route_stats.max_seconds, seconds)
+            route_stats.queries += stats.queries
+            route_stats.recent.append(seconds)
+
+    def summary(self) -> dict:
+        with self._lock:
+            return {route: stats.summary() for route, stats in sorted(self.routes.items())}
+
+
+class MetricsMiddleware:
+    """ASGI middleware; records into `metrics` when the response body is complete"""
+
+    def __init__(self, app, metrics: Metrics):
+        self.app = app
+        self.metrics = metrics
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = self.metrics.begin()
+        started = time.perf_counter()
+        status = 500
+        recorded = False
+
+        def record(error: bool):
+            nonlocal recorded
+            if recorded:
+                return
+            recorded = True
+            route = scope.get("route")
+            name = f"{scope['method']} {route.path if route else 'unmatched'}"
+            self.metrics.record(name, time.perf_counter() - started, stats, error)
+
+        async def send_and_record(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+            if message["type"] == "http.response.body" and not message.get("more_body", False):
+                record(status >= 500)
+
+        try:
+            await self.app(scope, receive, send_and_record)
+        except BaseException:
+            record(True)
+            raise
+        # The body never finished, e.g. the client went away mid-stream
+        record(status >= 500)
+
+
+def pool_status(engine) -> dict:
+    """Connection pool usage; pools without these counters report None"""
+    pool = engine.pool
+    status = {"class": type(pool).__name__}
+    for name in ("size", "checkedin", "checkedout", "overflow"):
+        method = getattr(pool, name, None)
+        status[name] = method() if callable(method) else None
+    return status
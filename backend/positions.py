@@ -0,0 +1,100 @@
+"""Write-behind buffer for node position updates.
+
+Updates are coalesced per node (only the latest x/y is kept) and handed to
+a flush callback once `max_size` distinct nodes are pending or `max_delay`
+seconds have passed since the first pending update, whichever comes first.
+
+Flushes run one at a time, in the order their batches were taken, so an
+older batch never overwrites a newer one. A batch whose flush raises is put
+back (behind any newer update for the same node) and retried after
+`max_delay`; the failure is counted in stats() instead of being raised to
+whoever triggered the flush.
+"""
+import threading
+
+
+class PositionBuffer:
+    def __init__(self, flush, max_size: int = 500, max_delay: float = 1.0):
+        """flush: callable taking a {node_id: (x, y)} dict"""
+        self._flush = flush
+        self.max_size = max_size
+        self.max_delay = max_delay
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._timer = None
+
+        self.received = 0
+        self.coalesced = 0
+        self.flushes = 0
+        self.flushed_rows = 0
+        self.failures = 0
+        self.last_error = None
+
+    def add(self, updates: dict):
+        with self._lock:
+            for node_id, position in updates.items():
+                self.received += 1
+                if node_id in self._pending:
+                    self.coalesced += 1
+                self._pending[node_id] = position
+
+            full = len(self._pending) >= self.max_size
+            if not full:
+                self._arm()
+
+        if full:
+            self.flush()
+
+    def flush(self) -> bool:
+        """Write everything pending now; False if the write failed and was re-queued"""
+        with self._flush_lock:
+            with self._lock:
+                batch = self._take()
+            return self._write(batch) if batch else True
+
+    def _arm(self):
+        # Caller holds self._lock
+        if self._pending and self._timer is None:
+            self._timer = threading.Timer(self.max_delay, self.flush)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def _take(self) -> dict:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch = self._pending
+        self._pending = {}
+        return batch
+
+    def _write(self, batch: dict) -> bool:
+        try:
+            self._flush(batch)
+        except Exception as e:
+            with self._lock:
+                for node_id, position in batch.items():
+                    self._pending.setdefault(node_id, position)
+                self.failures += 1
+                self.last_error = repr(e)
+                self._arm()
+            return False
+        with self._lock:
+            self.flushes += 1
+            self.flushed_rows += len(batch)
+        return True
+
+    @property
+    def pending(self) -> int:
+        return len(self._pending)
+
+    def stats(self) -> dict:
+        return {
+            "pending": self.pending,
+            "received": self.received,
+            "coalesced": self.coalesced,
+            "flushes": self.flushes,
+            "flushed_rows": self.flushed_rows,
+            "failures": self.failures,
+            "last_error": self.last_error,
+        }
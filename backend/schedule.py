@@ -0,0 +1,189 @@
+"""Schedule index over the nodes' cron expressions.
+
+Jobs are grouped by (cron_expression, calendar_string); each distinct pair
+is parsed once and keeps a forward-only croniter plus the runs generated
+from it so far. A min-heap keyed on each group's next run answers "what
+runs in the next N hours" by merging, in time order, only the groups that
+fire inside the window, and is advanced lazily as time passes.
+
+calendar_string restricts the days a job may run on. It is a list of
+weekdays and weekday ranges, e.g. "MON-FRI" or "MON,WED,SAT-SUN"; runs on
+other days are skipped. Empty or unrecognised calendars don't filter.
+"""
+from collections import deque
+from datetime import datetime, timedelta
+import heapq
+from itertools import islice
+import re
+import threading
+
+from croniter import croniter
+
+WEEKDAYS = ("MON", "TUE", "WED", "THU", "FRI", "SAT", "SUN")
+# Upper bound on skipped runs when looking for one the calendar allows
+MAX_CALENDAR_SKIPS = 1000
+
+_WINDOW_UNITS = {"s": 1, "m": 60, "h": 3600, "d": 86400, "w": 604800}
+MAX_WINDOW_SECONDS = 366 * 86400
+
+
+def parse_calendar(calendar: str):
+    """Allowed weekdays (0 = Monday) or None when the calendar doesn't filter"""
+    if not calendar:
+        return None
+    allowed = set()
+    for part in re.split(r"[,;\s]+", calendar.strip().upper()):
+        if not part:
+            continue
+        bounds = part.split("-")
+        if len(bounds) > 2 or any(b not in WEEKDAYS for b in bounds):
+            return None
+        start = WEEKDAYS.index(bounds[0])
+        end = WEEKDAYS.index(bounds[-1])
+        day = start
+        while True:
+            allowed.add(day)
+            if day == end:
+                break
+            day = (day + 1) % 7
+    return frozenset(allowed) or None
+
+
+def parse_window(window: str) -> float:
+    """'90', '30m', '6h', '2d' or '1w' -> seconds, at most MAX_WINDOW_SECONDS"""
+    match = re.fullmatch(r"\s*(\d+(?:\.\d+)?)\s*([smhdw]?)\s*", window or "")
+    if not match:
+        raise ValueError(f"Invalid window: {window!r}")
+    seconds = float(match.group(1)) * _WINDOW_UNITS[match.group(2) or "s"]
+    if seconds > MAX_WINDOW_SECONDS:
+        raise ValueError(f"Window too large: {window!r} (max {MAX_WINDOW_SECONDS // 86400} days)")
+    return seconds
+
+
+class Schedule:
+    """Runs of one (cron_expression, calendar_string) pair, generated on demand"""
+
+    def __init__(self, cron_expr: str, calendar: str, start: datetime):
+        self.node_ids = []
+        self.days = parse_calendar(calendar)
+        self.runs = deque()
+        try:
+            self._iter = croniter(cron_expr, start)
+        except Exception:
+            self._iter = None
+
+    @property
+    def valid(self) -> bool:
+        return self._iter is not None
+
+    def _generate(self) -> bool:
+        if self._iter is None:
+            return False
+        try:
+            for _ in range(MAX_CALENDAR_SKIPS):
+                run = self._iter.get_next(datetime)
+                if self.days is None or run.weekday() in self.days:
+                    self.runs.append(run)
+                    return True
+        except Exception:
+            pass
+        # No run the calendar allows (or croniter gave up): stop asking
+        self._iter = None
+        return False
+
+    def head(self):
+        """Next pending run, or None if there is none"""
+        if not self.runs and not self._generate():
+            return None
+        return self.runs[0]
+
+    def advance(self, now: datetime):
+        while self.runs and self.runs[0] <= now:
+            self.runs.popleft()
+        if not self.runs and self._iter is not None:
+            # Jump straight to now instead of replaying every missed run
+            self._iter.set_current(now, force=True)
+
+    def run_at(self, i: int):
+        """i-th pending run, generating up to it; None past the last run"""
+        while len(self.runs) <= i:
+            if not self._generate():
+                return None
+        return self.runs[i]
+
+
+class ScheduleIndex:
+    def __init__(self, jobs, now: datetime = None):
+        """jobs: iterable of (node_id, cron_expression, calendar_string)"""
+        now = now or datetime.now()
+        self._lock = threading.Lock()
+        self.schedules = {}
+        for node_id, cron_expr, calendar in jobs:
+            if not cron_expr:
+                continue
+            key = (cron_expr, calendar or "")
+            schedule = self.schedules.get(key)
+            if schedule is None:
+                schedule = self.schedules[key] = Schedule(cron_expr, calendar, now)
+            schedule.node_ids.append(node_id)
+
+        self._heap = []
+        for key, schedule in self.schedules.items():
+            if schedule.valid:
+                head = schedule.head()
+                if head is not None:
+                    self._heap.append((head, key))
+        heapq.heapify(self._heap)
+        self._now = now
+
+    def _advance(self, now: datetime):
+        """Drop runs that are already in the past"""
+        if now <= self._now:
+            return
+        self._now = now
+        heap = self._heap
+        while heap and heap[0][0] <= now:
+            _, key = heapq.heappop(heap)
+            schedule = self.schedules[key]
+            schedule.advance(now)
+            head = schedule.head()
+            if head is not None:
+                heapq.heappush(heap, (head, key))
+
+    def next_runs(self, now: datetime = None) -> dict:
+        """{(cron_expression, calendar_string): next run after now}"""
+        with self._lock:
+            self._advance(now or datetime.now())
+            return {key: run for run, key in self._heap}
+
+    def next_change(self, now: datetime = None):
+        """Earliest upcoming run across all jobs; next_runs() is stable until then"""
+        with self._lock:
+            self._advance(now or datetime.now())
+            return self._heap[0][0] if self._heap else None
+
+    def upcoming(self, seconds: float, now: datetime = None, limit: int = None) -> list:
+        """(run, node_id) pairs for runs within `seconds` from now, in time order, at most `limit`"""
+        now = now or datetime.now()
+        end = now + timedelta(seconds=seconds)
+        runs = []
+        with self._lock:
+            self._advance(now)
+            # k-way merge of the groups firing inside the window, one run at a time,
+            # until the runs picked cover `limit` jobs
+            merge = [(run, key, 0) for run, key in self._heap if run <= end]
+            heapq.heapify(merge)
+            covered = 0
+            while merge and (limit is None or covered < limit):
+                run, key, i = merge[0]
+                schedule = self.schedules[key]
+                runs.append((run, schedule.node_ids))
+                covered += len(schedule.node_ids)
+                following = schedule.run_at(i + 1)
+                if following is not None and following <= end:
+                    heapq.heapreplace(merge, (following, key, i + 1))
+                else:
+                    heapq.heappop(merge)
+
+        pairs = ((run, node_id) for run, node_ids in runs for node_id in node_ids)
+        return list(islice(pairs, limit))
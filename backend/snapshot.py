@@ -0,0 +1,146 @@
+"""Graph versioning, change log and cached /graph snapshots.
+
+Every committed write bumps a process-wide version and records which rows
+it touched. /graph serves a serialized snapshot cached per version (so the
+version doubles as the ETag) and /graph/changes merges the recorded change
+sets to answer "what changed since version N".
+
+Versions start at the process start time in milliseconds, so they keep
+increasing across restarts and a version from a previous process is simply
+treated as too old to diff against.
+"""
+from collections import deque
+import gzip
+import json
+import threading
+import time
+
+CHANGE_LOG_SIZE = 256
+GZIP_MIN_SIZE = 1024
+
+
+class ChangeSet:
+    """Ids touched by one write"""
+
+    def __init__(self):
+        self.nodes = set()
+        self.removed_nodes = set()
+        self.edges = set()
+        self.removed_edges = set()
+        self.positions = set()
+
+    @property
+    def empty(self) -> bool:
+        return not (self.nodes or self.removed_nodes or self.edges or self.removed_edges or self.positions)
+
+    @property
+    def positions_only(self) -> bool:
+        """Nothing but positions changed, so the graph's nodes and edges are as they were"""
+        return not (self.nodes or self.removed_nodes or self.edges or self.removed_edges)
+
+    def merge(self, other: "ChangeSet"):
+        self.nodes |= other.nodes
+        self.nodes -= other.removed_nodes
+        self.removed_nodes -= other.nodes
+        self.removed_nodes |= other.removed_nodes
+        self.positions |= other.positions
+        self.positions -= other.removed_nodes
+
+        self.edges |= other.edges
+        self.edges -= other.removed_edges
+        self.removed_edges -= other.edges
+        self.removed_edges |= other.removed_edges
+
+
+class GraphVersion:
+    def __init__(self, log_size: int = CHANGE_LOG_SIZE):
+        self._lock = threading.Lock()
+        self.version = int(time.time() * 1000)
+        # Oldest version the log can still diff against
+        self._base = self.version
+        # Version of the last write that touched nodes or edges, not just positions
+        self.topology = self.version
+        self._log = deque()
+        self._log_size = log_size
+
+    def bump(self, changes: ChangeSet = None) -> int:
+        """
+        Register a committed write. Passing no change set (e.g. for /reset)
+        drops the log so older clients fall back to a full reload.
+        """
+        with self._lock:
+            self.version += 1
+            if changes is None or not changes.positions_only:
+                self.topology = self.version
+            if changes is None:
+                self._log.clear()
+                self._base = self.version
+            else:
+                self._log.append((self.version, changes))
+                if len(self._log) > self._log_size:
+                    self._base = self._log.popleft()[0]
+            return self.version
+
+    def changes_since(self, since: int):
+        """Merged ChangeSet after `since`, or None if the log can't answer"""
+        with self._lock:
+            if since < self._base or since > self.version:
+                return None
+            merged = ChangeSet()
+            for version, changes in self._log:
+                if version > since:
+                    merged.merge(changes)
+            return merged
+
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    """If-None-Match check: "*" or any listed entity tag, compared weakly"""
+    if not if_none_match:
+        return False
+    opaque = etag[2:] if etag.startswith("W/") else etag
+    for tag in if_none_match.split(","):
+        tag = tag.strip()
+        if tag == "*":
+            return True
+        if tag.startswith("W/"):
+            tag = tag[2:]
+        if tag == opaque:
+            return True
+    return False
+
+
+class Snapshot:
+    def __init__(self, version: int, payload: dict):
+        self.version = version
+        self.etag = f'"{version}"'
+        self.body = json.dumps(payload, separators=(",", ":")).encode("utf-8")
+        self._gzipped = None
+
+    @property
+    def gzipped(self) -> bytes:
+        if self._gzipped is None:
+            self._gzipped = gzip.compress(self.body, compresslevel=5)
+        return self._gzipped
+
+    @property
+    def compressible(self) -> bool:
+        return len(self.body) >= GZIP_MIN_SIZE
+
+
+class SnapshotCache:
+    """Keeps the serialized snapshot of the latest version only"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._snapshot = None
+
+    def get(self, version: int, build) -> Snapshot:
+        snapshot = self._snapshot
+        if snapshot is not None and snapshot.version == version:
+            return snapshot
+        with self._lock:
+            snapshot = self._snapshot
+            if snapshot is None or snapshot.version != version:
+                snapshot = Snapshot(version, build())
+                self._snapshot = snapshot
+            return snapshot
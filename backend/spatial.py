@@ -0,0 +1,112 @@
+"""Uniform-grid spatial index over node positions.
+
+Nodes are bucketed into square cells of `cell_size` canvas units. A
+bounding-box query only visits the cells it overlaps (or the occupied
+cells, whichever is fewer), so its cost follows the viewport rather than
+the size of the graph.
+"""
+import math
+import threading
+
+DEFAULT_CELL_SIZE = 500.0
+
+
+class GridIndex:
+    def __init__(self, points=(), cell_size: float = DEFAULT_CELL_SIZE):
+        """points: iterable of (node_id, x, y)"""
+        self.cell_size = cell_size
+        self.positions = {}
+        self.cells = {}
+        self._lock = threading.Lock()
+        for node_id, x, y in points:
+            self._insert(node_id, x or 0.0, y or 0.0)
+
+    def __len__(self):
+        return len(self.positions)
+
+    def __contains__(self, node_id):
+        return node_id in self.positions
+
+    def _cell(self, x, y):
+        return (math.floor(x / self.cell_size), math.floor(y / self.cell_size))
+
+    def _insert(self, node_id, x, y):
+        self.positions[node_id] = (x, y)
+        self.cells.setdefault(self._cell(x, y), set()).add(node_id)
+
+    def _remove(self, node_id):
+        old = self.positions.pop(node_id, None)
+        if old is None:
+            return
+        cell = self._cell(*old)
+        members = self.cells[cell]
+        members.discard(node_id)
+        if not members:
+            del self.cells[cell]
+
+    def move(self, node_id, x, y):
+        """Insert a node or update its position"""
+        with self._lock:
+            self._remove(node_id)
+            self._insert(node_id, x, y)
+
+    def remove(self, node_id):
+        with self._lock:
+            self._remove(node_id)
+
+    def position(self, node_id):
+        """(x, y) of a node, or None"""
+        with self._lock:
+            return self.positions.get(node_id)
+
+    def snapshot(self, node_ids=None) -> dict:
+        """Copy of {node_id: (x, y)}, for all nodes or those of node_ids still indexed"""
+        with self._lock:
+            if node_ids is None:
+                return dict(self.positions)
+            positions = self.positions
+            return {node_id: positions[node_id] for node_id in node_ids if node_id in positions}
+
+    def query(self, min_x, min_y, max_x, max_y) -> list:
+        """Ids of nodes whose position lies inside the box (inclusive)"""
+        lo_i, lo_j = self._cell(min_x, min_y)
+        hi_i, hi_j = self._cell(max_x, max_y)
+        positions = self.positions
+        found = []
+
+        with self._lock:
+            if (hi_i - lo_i + 1) * (hi_j - lo_j + 1) <= len(self.cells):
+                candidates = (
+                    self.cells.get((i, j), ())
+                    for i in range(lo_i, hi_i + 1)
+                    for j in range(lo_j, hi_j + 1)
+                )
+            else:
+                candidates = (
+                    members
+                    for (i, j), members in self.cells.items()
+                    if lo_i <= i <= hi_i and lo_j <= j <= hi_j
+                )
+
+            for members in candidates:
+                for node_id in members:
+                    x, y = positions[node_id]
+                    if min_x <= x <= max_x and min_y <= y <= max_y:
+                        found.append(node_id)
+        return found
+
+    def clusters(self, node_ids, cell_size: float) -> dict:
+        """cluster_points() over the current positions of node_ids"""
+        return cluster_points(self.snapshot(node_ids), cell_size)
+
+
+def cluster_points(points: dict, cell_size: float) -> dict:
+    """
+    Group {node_id: (x, y)} into square buckets of `cell_size`.
+    Returns {(i, j): [node_id, ...]}.
+    """
+    buckets = {}
+    for node_id, (x, y) in points.items():
+        key = (math.floor(x / cell_size), math.floor(y / cell_size))
+        buckets.setdefault(key, []).append(node_id)
+    return buckets
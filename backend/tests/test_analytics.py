@@ -0,0 +1,19 @@
+from datetime import datetime
+
+from analytics import _previous_fires
+
+
+def test_previous_fires_include_a_fire_at_the_time_itself():
+    on_fire = datetime(2024, 6, 3, 10, 0)
+    between = datetime(2024, 6, 3, 9, 0)
+
+    # Few jobs over a short span: walks the fires
+    assert _previous_fires("0 10 * * *", [on_fire, between]) == [on_fire, datetime(2024, 6, 2, 10, 0)]
+
+    # A far older job makes walking the fires too costly: one get_prev per job
+    old = datetime(2020, 1, 1, 12, 0)
+    assert _previous_fires("0 10 * * *", [on_fire, between, old]) == [
+        on_fire,
+        datetime(2024, 6, 2, 10, 0),
+        datetime(2020, 1, 1, 10, 0),
+    ]
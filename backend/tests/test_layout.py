@@ -0,0 +1,23 @@
+HEADER = "object,schema,server,owner,creation_date,last_update,cron_expression,depends_on,position_x,position_y,calendar_string\n"
+ROWS = "a,s,srv,o,2024-01-01,,,,,,\nb,s,srv,o,2024-01-01,,,a,,,\n"
+
+
+def upload(client, data):
+    response = client.post("/upload", files={"file": ("graph.csv", HEADER + data, "text/csv")})
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+def test_full_layout_is_cached_until_the_topology_changes(client):
+    upload(client, ROWS)
+    assert client.post("/layout").json()["cached"] is False
+
+    # Neither a no-op re-upload nor moving a node changes the layout
+    upload(client, ROWS)
+    client.post("/positions", json={"id": "a", "position": {"x": 1, "y": 1}})
+    result = client.post("/layout").json()
+    assert result["cached"] is True
+    assert result["updated"] == 1
+
+    upload(client, ROWS + "c,s,srv,o,2024-01-01,,,b,,,\n")
+    assert client.post("/layout").json()["cached"] is False
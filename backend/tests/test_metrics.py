@@ -0,0 +1,20 @@
+CSV = (
+    "object,schema,server,owner,creation_date,last_update,cron_expression,depends_on,position_x,position_y,calendar_string\n"
+    "a,s,srv,o,2024-01-01,,,,,,\n"
+    "b,s,srv,o,2024-01-01,,,a,,,\n"
+)
+
+
+def test_streamed_export_is_recorded_with_its_queries(client):
+    import main
+
+    client.post("/upload", files={"file": ("graph.csv", CSV, "text/csv")})
+    before = main.metrics.summary().get("GET /graph/export", {"count": 0, "queries": 0})
+
+    response = client.get("/graph/export")
+    assert response.status_code == 200
+
+    after = main.metrics.summary()["GET /graph/export"]
+    assert after["count"] == before["count"] + 1
+    # Nodes and edges are read while the body streams
+    assert after["queries"] - before["queries"] >= 2
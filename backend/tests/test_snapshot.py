@@ -0,0 +1,79 @@
+from snapshot import ChangeSet, GraphVersion, etag_matches
+
+HEADER = "object,schema,server,owner,creation_date,last_update,cron_expression,depends_on,position_x,position_y,calendar_string\n"
+
+
+def change(**ids):
+    changes = ChangeSet()
+    for field, values in ids.items():
+        getattr(changes, field).update(values)
+    return changes
+
+
+def test_merge_keeps_the_latest_of_remove_and_re_add():
+    merged = ChangeSet()
+    merged.merge(change(nodes={"a"}, positions={"a"}, edges={"a->b"}))
+    merged.merge(change(removed_nodes={"a"}, removed_edges={"a->b"}))
+    assert (merged.nodes, merged.removed_nodes, merged.positions) == (set(), {"a"}, set())
+    assert (merged.edges, merged.removed_edges) == (set(), {"a->b"})
+
+    merged.merge(change(nodes={"a"}, edges={"a->b"}))
+    assert (merged.nodes, merged.removed_nodes) == ({"a"}, set())
+    assert (merged.edges, merged.removed_edges) == ({"a->b"}, set())
+
+
+def test_changes_since_falls_off_the_log():
+    version = GraphVersion(log_size=2)
+    start = version.version
+    first = version.bump(change(nodes={"a"}))
+    version.bump(change(nodes={"b"}))
+    assert version.changes_since(start).nodes == {"a", "b"}
+
+    version.bump(change(nodes={"c"}))
+    assert version.changes_since(start) is None
+    assert version.changes_since(first).nodes == {"b", "c"}
+    assert version.changes_since(version.version + 1) is None
+
+
+def test_bump_without_changes_clears_the_log():
+    version = GraphVersion()
+    start = version.version
+    version.bump(change(nodes={"a"}))
+    version.bump()
+    assert version.changes_since(start) is None
+    assert version.changes_since(version.version).empty
+
+
+def test_etag_matches():
+    assert etag_matches('"7"', '"7"')
+    assert etag_matches('"6", W/"7"', '"7"')
+    assert etag_matches("*", '"7"')
+    assert not etag_matches('"17"', '"7"')
+    assert not etag_matches("", '"7"')
+
+
+def test_graph_etag_and_304(client):
+    client.post("/upload", files={"file": ("graph.csv", HEADER + "a,s,srv,o,2024-01-01,,,,,,\n", "text/csv")})
+    response = client.get("/graph")
+    etag = response.headers["etag"]
+    assert response.headers["x-graph-version"] in etag
+
+    for header in (etag, f'"0", {etag}', "*"):
+        assert client.get("/graph", headers={"If-None-Match": header}).status_code == 304
+    assert client.get("/graph", headers={"If-None-Match": '"0"'}).status_code == 200
+
+    client.post("/positions", json={"id": "a", "position": {"x": 5, "y": 5}})
+    assert client.get("/graph", headers={"If-None-Match": etag}).status_code == 200
+
+
+def test_changes_since_and_reset(client):
+    client.post("/upload", files={"file": ("graph.csv", HEADER + "a,s,srv,o,2024-01-01,,,,,,\n", "text/csv")})
+    since = int(client.get("/graph").headers["x-graph-version"])
+
+    client.post("/positions", json={"id": "a", "position": {"x": 5, "y": 6}})
+    delta = client.get("/graph/changes", params={"since": since}).json()
+    assert delta["full_resync"] is False
+    assert delta["positions"] == [{"id": "a", "x": 5.0, "y": 6.0}]
+
+    client.delete("/reset")
+    assert client.get("/graph/changes", params={"since": since}).json()["full_resync"] is True
@@ -0,0 +1,27 @@
+import threading
+
+from spatial import GridIndex
+
+
+def test_reads_are_safe_while_nodes_move():
+    index = GridIndex((f"n{i}", i * 10.0, 0.0) for i in range(2000))
+    done = threading.Event()
+
+    def mover():
+        step = 0
+        while not done.is_set():
+            step += 1
+            for i in range(0, 2000, 7):
+                index.move(f"n{i}", (i + step) * 10.0, step % 500)
+
+    thread = threading.Thread(target=mover)
+    thread.start()
+    try:
+        for _ in range(50):
+            assert len(index.snapshot()) == 2000
+            buckets = index.clusters([f"n{i}" for i in range(2000)], 1000.0)
+            assert sum(len(members) for members in buckets.values()) == 2000
+            assert index.position("n7") is not None
+    finally:
+        done.set()
+        thread.join()
@@ -0,0 +1,77 @@
+HEADER = "object,schema,server,owner,creation_date,last_update,cron_expression,depends_on,position_x,position_y,calendar_string\n"
+
+
+def upload(client, *rows):
+    data = HEADER + "".join(row + "\n" for row in rows)
+    response = client.post("/upload", files={"file": ("graph.csv", data, "text/csv")})
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+def nodes_by_id(client):
+    return {node["id"]: node for node in client.get("/graph").json()["nodes"]}
+
+
+def test_upload_applies_differences(client):
+    first = upload(
+        client,
+        "a,s,srv,o,2024-01-01,,,,10,20,",
+        "b,s,srv,o,2024-01-01,,,a,30,40,",
+    )
+    assert first["nodes"] == {"added": 2, "changed": 0, "removed": 0}
+    assert first["edges"] == {"added": 1, "removed": 0}
+
+    client.post("/positions", json={"id": "a", "position": {"x": 100, "y": 200}})
+
+    second = upload(
+        client,
+        "a,s,srv,o2,2024-01-01,,,,1,1,",
+        "c,s,srv,o,2024-01-01,,,a,50,60,",
+    )
+    assert second["nodes"] == {"added": 1, "changed": 1, "removed": 1}
+    assert second["edges"] == {"added": 1, "removed": 1}
+
+    nodes = nodes_by_id(client)
+    assert set(nodes) == {"a", "c"}
+    assert nodes["a"]["owner"] == "o2"
+    # Stored positions win over the CSV's for existing nodes
+    assert (nodes["a"]["x"], nodes["a"]["y"]) == (100, 200)
+    assert (nodes["c"]["x"], nodes["c"]["y"]) == (50, 60)
+
+
+def test_unchanged_upload_keeps_version(client):
+    rows = ("a,s,srv,o,2024-01-01,,,,,,", "b,s,srv,o,2024-01-01,,,a,,,")
+    first = upload(client, *rows)
+    second = upload(client, *rows)
+    assert second["nodes"] == {"added": 0, "changed": 0, "removed": 0}
+    assert second["version"] == first["version"]
+
+
+def test_repeated_row_counts_as_one_change(client):
+    upload(client, "a,s,srv,o,2024-01-01,,,,,,")
+    # The first repeat matches the stored row, the last one changes it
+    result = upload(client, "a,s,srv,o,2024-01-01,,,,,,", "a,s,srv,o3,2024-01-01,,,,,,")
+    assert result["nodes"] == {"added": 0, "changed": 1, "removed": 0}
+    assert nodes_by_id(client)["a"]["owner"] == "o3"
+
+
+def test_schedule_read_during_upload_sees_new_cron(client, monkeypatch):
+    import main
+
+    upload(client, "a,s,srv,o,2024-01-01,,*/5 * * * *,,,,")
+
+    # A poll that lands while the upload rebuilds its indexes
+    polled = {}
+    refresh_indexes = main.refresh_indexes
+
+    def refresh_with_poll(db):
+        polled["etag"] = client.get("/schedule/next").headers["etag"]
+        refresh_indexes(db)
+
+    monkeypatch.setattr(main, "refresh_indexes", refresh_with_poll)
+    upload(client, "a,s,srv,o,2024-01-01,,*/5 * * * *,,,,", "b,s,srv,o,2024-01-01,,0 4 * * *,,,,")
+
+    response = client.get("/schedule/next", headers={"If-None-Match": polled["etag"]})
+    assert response.status_code == 200
+    assert "0 4 * * *" in {run["cron_expression"] for run in response.json()["runs"]}
+    assert "next_execution" not in nodes_by_id(client)["b"]
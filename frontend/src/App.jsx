@@ -124,8 +124,20 @@ function App() {
 
   const fetchGraph = async () => {
     try {
-      const res = await axios.get(`${backendUrl}/graph`);
-      const { nodes: fetchedNodes, edges: fetchedEdges } = res.data;
+      const [res, schedule] = await Promise.all([
+        axios.get(`${backendUrl}/graph`),
+        axios.get(`${backendUrl}/schedule/next`),
+      ]);
+      const { nodes: graphNodes, edges: fetchedEdges } = res.data;
+      // Next runs are served per (cron, calendar) group, not per node
+      const nextRuns = {};
+      for (const run of schedule.data.runs) {
+        nextRuns[`${run.cron_expression}|${run.calendar_string}`] = run.next_execution;
+      }
+      const fetchedNodes = graphNodes.map((node) => ({
+        ...node,
+        next_execution: nextRuns[`${node.cron_expression}|${node.calendar_string || ''}`] || '',
+      }));
       setRawNodes(fetchedNodes);
       setRawEdges(fetchedEdges);
       const positions = {};
@@ -215,15 +227,17 @@ function App() {
     setEdges(updatedEdges);
   }, [rawNodes, rawEdges, collapsedParents, highlightedNodeIds, highlightedEdgeIds]);
 
-  const onNodeDragStop = async (_, node) => {
-    positionsRef.current[node.id] = node.position;
+  const onNodeDragStop = async (_, node, draggedNodes) => {
+    const moved = draggedNodes && draggedNodes.length ? draggedNodes : [node];
+    for (const n of moved) {
+      positionsRef.current[n.id] = n.position;
+    }
     try {
-      await axios.post(`${backendUrl}/positions`, {
-        id: node.id,
-        position: node.position,
+      await axios.post(`${backendUrl}/positions/batch`, {
+        positions: moved.map((n) => ({ id: n.id, x: n.position.x, y: n.position.y })),
       });
     } catch (error) {
-      console.error('Failed to update node position:', error);
+      console.error('Failed to update node positions:', error);
     }
   };
 